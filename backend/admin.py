@@ -1,8 +1,13 @@
 import sys
 from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine
-from app.models import Market, User, Position, Transaction, MarketStatus, MarketCategory
-from datetime import datetime
+from app.database import SessionLocal
+from app.models import (
+    Market, MarketStats, MarketOutcome, User, Position, Transaction, ArchivedTransaction, TransactionSummary,
+    MarketStatus, MarketType, MarketCategory
+)
+from app.ledger import reconcile_balances, take_balance_snapshots, post_opening_balances
+from app.settlement import settle_market
+from app.risk import RiskBook, preview_resolution
 
 
 def get_db():
@@ -28,8 +33,15 @@ def list_markets(db: Session):
         print(f"   College: {market.college_name}")
         print(f"   Description: {market.description or 'N/A'}")
         print(f"   Status: {market.status.value.upper()}")
-        print(f"   Prices: YES {market.yes_price}¢ / NO {market.no_price}¢")
+        if market.market_type == MarketType.MULTI:
+            print("   Outcomes: " + ", ".join(f"{o.label} {o.price}¢" for o in market.outcomes))
+        else:
+            print(f"   Prices: YES {market.yes_price}¢ / NO {market.no_price}¢")
         print(f"   Volume: {market.total_yes_shares + market.total_no_shares} shares")
+        if market.close_at:
+            print(f"   Closes: {market.close_at.strftime('%Y-%m-%d %H:%M')} UTC")
+        if market.pending_outcome:
+            print(f"   Resolves {market.pending_outcome} at: {market.resolve_at.strftime('%Y-%m-%d %H:%M')} UTC")
         if market.resolved_outcome:
             print(f"   Outcome: {market.resolved_outcome}")
     
@@ -112,11 +124,13 @@ def delete_market(db: Session):
     # Check if market has positions
     positions_count = db.query(Position).filter(Position.market_id == market_id).count()
     transactions_count = db.query(Transaction).filter(Transaction.market_id == market_id).count()
+    archived_count = db.query(ArchivedTransaction).filter(ArchivedTransaction.market_id == market_id).count()
     
     print(f"\n⚠️  WARNING: This will delete:")
     print(f"   Market: {market.college_name}")
     print(f"   {positions_count} position(s)")
     print(f"   {transactions_count} transaction(s)")
+    print(f"   {archived_count} archived transaction(s)")
     
     confirm = input("\nType 'DELETE' to confirm: ").strip()
     
@@ -127,6 +141,10 @@ def delete_market(db: Session):
     # Delete related records
     db.query(Position).filter(Position.market_id == market_id).delete()
     db.query(Transaction).filter(Transaction.market_id == market_id).delete()
+    db.query(ArchivedTransaction).filter(ArchivedTransaction.market_id == market_id).delete()
+    db.query(TransactionSummary).filter(TransactionSummary.market_id == market_id).delete()
+    db.query(MarketStats).filter(MarketStats.market_id == market_id).delete()
+    db.query(MarketOutcome).filter(MarketOutcome.market_id == market_id).delete()
     db.query(Market).filter(Market.id == market_id).delete()
     
     db.commit()
@@ -139,16 +157,16 @@ def resolve_market(db: Session):
     print("\n⚖️  RESOLVE MARKET")
     print("-" * 40)
     
-    # Show only open markets
-    markets = db.query(Market).filter(Market.status == MarketStatus.OPEN).all()
+    # Show only unresolved markets (open, or closed by the scheduler)
+    markets = db.query(Market).filter(Market.status != MarketStatus.RESOLVED).all()
     
     if not markets:
         print("\n📭 No open markets to resolve.\n")
         return
     
-    print("\nOpen markets:")
+    print("\nUnresolved markets:")
     for market in markets:
-        print(f"   {market.id}: {market.college_name}")
+        print(f"   {market.id}: {market.college_name} ({market.status.value})")
     
     try:
         market_id = int(input("\nEnter market ID to resolve (0 to cancel): "))
@@ -165,42 +183,68 @@ def resolve_market(db: Session):
         print(f"❌ Market with ID {market_id} not found!")
         return
     
-    if market.status != MarketStatus.OPEN:
+    if market.status == MarketStatus.RESOLVED:
         print(f"❌ Market is already {market.status.value}!")
         return
     
     print(f"\n📊 Resolving: {market.college_name}")
+    
+    if market.market_type == MarketType.MULTI:
+        resolve_multi_market(db, market)
+        return
+    
     print(f"   Current prices: YES {market.yes_price}¢ / NO {market.no_price}¢")
     
+    # Show what each outcome would cost before committing to one
+    for side, preview in preview_resolution(db, market).items():
+        print(
+            f"   If {side}: pay ${preview['payout'] / 100:.2f} to {preview['winning_positions']} position(s), "
+            f"net ${preview['net_exposure'] / 100:.2f} after premiums"
+        )
+    
     outcome = input("\nOutcome (YES/NO): ").strip().upper()
     
     if outcome not in ["YES", "NO"]:
         print("❌ Invalid outcome. Must be YES or NO")
         return
     
-    # Resolve market
-    market.status = MarketStatus.RESOLVED
-    market.resolved_outcome = outcome
-    market.resolution_date = datetime.utcnow()
+    # Resolve market and pay out winners
+    winners_count, total_payout = settle_market(db, market, outcome)
+    
+    db.commit()
+    
+    print(f"\n✅ Market resolved successfully!")
+    print(f"   Outcome: {outcome}")
+    print(f"   Winners: {winners_count}")
+    print(f"   Total payout: ${total_payout / 100:.2f}\n")
+
+
+def resolve_multi_market(db: Session, market: Market):
+    """Pick the winning outcome of a multi-outcome market and pay out"""
+    previews = preview_resolution(db, market)
+    for outcome in market.outcomes:
+        preview = previews[outcome.label]
+        print(
+            f"   {outcome.index}: {outcome.label} ({outcome.price}¢) pays ${preview['payout'] / 100:.2f} "
+            f"to {preview['winning_positions']} position(s), net ${preview['net_exposure'] / 100:.2f} after premiums"
+        )
     
-    # Pay out winners
-    positions = db.query(Position).filter(Position.market_id == market_id).all()
+    try:
+        index = int(input("\nWinning outcome number: "))
+    except ValueError:
+        index = -1
     
-    winners_count = 0
-    total_payout = 0
+    if not 0 <= index < len(market.outcomes):
+        print("❌ Invalid outcome")
+        return
+    outcome = market.outcomes[index]
     
-    for position in positions:
-        if position.shares > 0 and position.outcome.value == outcome:
-            # Winner! Each share pays 100 cents
-            payout = position.shares * 100
-            position.user.balance += payout
-            winners_count += 1
-            total_payout += payout
+    winners_count, total_payout = settle_market(db, market, outcome.label)
     
     db.commit()
     
     print(f"\n✅ Market resolved successfully!")
-    print(f"   Outcome: {outcome}")
+    print(f"   Outcome: {outcome.label}")
     print(f"   Winners: {winners_count}")
     print(f"   Total payout: ${total_payout / 100:.2f}\n")
 
@@ -229,6 +273,61 @@ def list_users(db: Session):
     print("\n" + "="*80 + "\n")
 
 
+def reconcile_ledger(db: Session):
+    """Check every user's balance against the ledger"""
+    print("\n🧾 RECONCILE BALANCES")
+    print("-" * 40)
+    
+    checked, mismatches = reconcile_balances(db)
+    
+    if not mismatches:
+        print(f"\n✅ All {checked} user(s) match the ledger.\n")
+        return
+    
+    print(f"\n⚠️  {len(mismatches)} of {checked} user(s) do not match the ledger:")
+    for user_id, username, balance, ledger_balance in mismatches:
+        print(f"   {user_id}: {username} balance ${balance / 100:.2f}, ledger ${ledger_balance / 100:.2f}")
+    
+    confirm = input("\nPost opening entries for balances the ledger does not cover? (y/N): ").strip().lower()
+    if confirm == "y":
+        opened = post_opening_balances(db)
+        print(f"✅ Opened {opened} account(s)\n")
+
+
+def snapshot_balances(db: Session):
+    """Snapshot every user's ledger balance"""
+    taken = take_balance_snapshots(db)
+    print(f"\n📸 Snapshotted {taken} user balance(s)\n")
+
+
+def show_risk(db: Session):
+    """Show outstanding liabilities and net exposure of unresolved markets"""
+    book = RiskBook()
+    book.load(db)
+    summary = book.summary(top=10)
+    
+    print("\n" + "="*80)
+    print("📉 RISK EXPOSURE")
+    print("="*80)
+    print(f"\n   Unresolved markets with positions: {summary['markets']}")
+    print(f"   YES liability: ${summary['yes_liability'] / 100:.2f}")
+    print(f"   NO liability: ${summary['no_liability'] / 100:.2f}")
+    print(f"   Multi-outcome liability (worst outcome): ${summary['multi_liability'] / 100:.2f}")
+    print(f"   Premiums collected: ${summary['premiums_collected'] / 100:.2f}")
+    print(f"   Worst-case net exposure: ${summary['worst_case_exposure'] / 100:.2f}")
+    
+    if summary["top_markets"]:
+        print("\n   Largest exposures:")
+        for market in summary["top_markets"]:
+            if market["market_type"] == MarketType.MULTI.value:
+                detail = f"if {market['worst_outcome']} pays ${market['worst_liability'] / 100:.2f}"
+            else:
+                detail = f"if YES ${market['net_if_yes'] / 100:.2f} / if NO ${market['net_if_no'] / 100:.2f}"
+            print(f"   {market['market_id']}: worst ${market['worst_case_exposure'] / 100:.2f} ({detail})")
+    
+    print("\n" + "="*80 + "\n")
+
+
 def main_menu():
     """Display main menu"""
     print("\n" + "="*80)
@@ -239,6 +338,9 @@ def main_menu():
     print("3. Delete market")
     print("4. Resolve market")
     print("5. List all users")
+    print("6. Reconcile balances")
+    print("7. Snapshot balances")
+    print("8. Show risk exposure")
     print("0. Exit")
     print("\n" + "-"*80)
 
@@ -262,6 +364,12 @@ def main():
                 resolve_market(db)
             elif choice == "5":
                 list_users(db)
+            elif choice == "6":
+                reconcile_ledger(db)
+            elif choice == "7":
+                snapshot_balances(db)
+            elif choice == "8":
+                show_risk(db)
             elif choice == "0":
                 print("\n👋 Goodbye!\n")
                 break
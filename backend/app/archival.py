@@ -0,0 +1,150 @@
+"""
+Archival of transactions in long-resolved markets.
+
+Resolved markets never trade again, so once a market has been resolved
+for ARCHIVE_AFTER_DAYS its transactions are moved to archived_transactions
+and rolled up into one transaction_summaries row per user and market.
+Rows move in batches of ARCHIVE_BATCH_SIZE, each in its own short write
+transaction. /transactions reads both tables, so history stays complete,
+and /transactions/summary serves the rollups.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, delete, update, case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import Market, Transaction, ArchivedTransaction, TransactionSummary, MarketStatus
+
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("TRANSACTION_ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("TRANSACTION_ARCHIVE_BATCH_SIZE", "500"))
+
+# Pause between batches so trades get the write lock in between
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.getenv("TRANSACTION_ARCHIVE_BATCH_PAUSE_SECONDS", "0.05"))
+
+_moved_columns = [
+    "id", "user_id", "market_id", "transaction_type", "outcome", "outcome_id",
+    "shares", "price_per_share", "total_cost", "timestamp",
+]
+
+
+def archive_transactions(
+    db: Session,
+    now: datetime | None = None,
+    older_than: timedelta = timedelta(days=ARCHIVE_AFTER_DAYS),
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause: float = ARCHIVE_BATCH_PAUSE_SECONDS
+) -> int:
+    """
+    Move transactions of markets resolved before `now - older_than`.
+    Returns the number moved.
+
+    Every worker runs this job, so each batch is claimed by deleting it
+    first: only the rows this run's DELETE ... RETURNING removed are
+    archived and summarized. A run that collides with another on a new
+    summary row rolls back that batch and stops; the next run picks it up.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - older_than
+    moved = 0
+
+    newest = select(func.max(Transaction.id)).scalar_subquery()
+
+    while True:
+        ids = db.scalars(
+            select(Transaction.id)
+            .join(Market, Market.id == Transaction.market_id)
+            .where(
+                Market.status == MarketStatus.RESOLVED,
+                Market.resolution_date < cutoff,
+                # SQLite hands out max(id) + 1, so moving the newest row
+                # would let a new trade reuse an archived id
+                Transaction.id < newest
+            )
+            .order_by(Transaction.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+
+        claimed = db.execute(
+            delete(Transaction)
+            .where(Transaction.id.in_(ids))
+            .returning(*(getattr(Transaction, column) for column in _moved_columns))
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        try:
+            if claimed:
+                db.execute(
+                    insert(ArchivedTransaction),
+                    [dict(zip(_moved_columns, row), archived_at=now) for row in claimed]
+                )
+                _summarize(db, claimed)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            break
+
+        moved += len(claimed)
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+
+    return moved
+
+
+def _summarize(db: Session, rows: list) -> None:
+    """
+    Fold claimed transaction rows (in _moved_columns order) into the
+    per-user, per-market summaries. Existing summaries are incremented in
+    SQL, so concurrent runs can't overwrite each other. Does not commit.
+    """
+    totals: dict[tuple[int, int], list] = {}
+    for row in rows:
+        record = dict(zip(_moved_columns, row))
+        key = (record["user_id"], record["market_id"])
+        total = totals.get(key)
+        if total is None:
+            totals[key] = [1, record["shares"], record["total_cost"], record["timestamp"], record["timestamp"]]
+        else:
+            total[0] += 1
+            total[1] += record["shares"]
+            total[2] += record["total_cost"]
+            total[3] = min(total[3], record["timestamp"])
+            total[4] = max(total[4], record["timestamp"])
+
+    # A market's transactions can span batches, so merge into existing rows
+    for (user_id, market_id), (trade_count, shares, total_cost, first_at, last_at) in totals.items():
+        updated = db.execute(
+            update(TransactionSummary)
+            .where(TransactionSummary.user_id == user_id, TransactionSummary.market_id == market_id)
+            .values(
+                trade_count=TransactionSummary.trade_count + trade_count,
+                shares=TransactionSummary.shares + shares,
+                total_cost=TransactionSummary.total_cost + total_cost,
+                first_trade_at=case(
+                    (TransactionSummary.first_trade_at > first_at, first_at),
+                    else_=TransactionSummary.first_trade_at
+                ),
+                last_trade_at=case(
+                    (TransactionSummary.last_trade_at < last_at, last_at),
+                    else_=TransactionSummary.last_trade_at
+                )
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.add(TransactionSummary(
+                user_id=user_id,
+                market_id=market_id,
+                trade_count=trade_count,
+                shares=shares,
+                total_cost=total_cost,
+                first_trade_at=first_at,
+                last_trade_at=last_at
+            ))
+    db.flush()
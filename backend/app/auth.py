@@ -1,38 +1,50 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from functools import lru_cache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import os
-from dotenv import load_dotenv
 
-from .database import get_db
+from . import config  # noqa: F401  (loads .env)
+from .database import get_db, get_read_db, READ_YOUR_WRITES_SECONDS
 from .models import User
 
-load_dotenv()
-
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Comma-separated usernames allowed to use /admin endpoints
+ADMIN_USERNAMES = {
+    name.strip().lower() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()
+}
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
+# passlib and python-jose are imported on first use: together they are a
+# large share of the app's own import time, and a worker may serve plenty
+# of requests (e.g. /markets) before it needs either.
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 def hash_password(password: str) -> str:
     """Hash a plain password."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a JWT access token."""
+    from jose import jwt
+    
     to_encode = data.copy()
     
     if expires_delta:
@@ -47,6 +59,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
 
 def decode_access_token(token: str) -> dict:
     """Decode and verify a JWT token."""
+    from jose import JWTError, jwt
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -101,4 +115,29 @@ def get_current_user(
     if user is None:
         raise credentials_exception
     
+    return user
+
+
+def get_user_read_db(user: User = Depends(get_current_user)):
+    """
+    Read session for the current user's own data. Right after the user
+    writes, it stays on the primary so they see their own trades. The
+    write time lives on the user row, which get_current_user reads from
+    the primary, so every worker sees it.
+    """
+    last_write = user.last_write_at
+    if last_write is not None and datetime.utcnow() - last_write < timedelta(seconds=READ_YOUR_WRITES_SECONDS):
+        yield from get_db()
+    else:
+        yield from get_read_db()
+
+
+def get_admin_user(user: User = Depends(get_current_user)) -> User:
+    """Dependency that only lets users listed in ADMIN_USERNAMES through."""
+    if user.username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
     return user
\ No newline at end of file
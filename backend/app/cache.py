@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from typing import Callable, Hashable
+
+from fastapi import Response
+
+from .compression import compress, COMPRESSION_MIN_SIZE
+
+
+class CachedPayload:
+    """
+    A serialized body (JSON unless told otherwise) plus its compressed
+    variants. Each encoding is computed at most once, on the first request
+    that asks for it.
+    """
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self._encoded: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = self._encoded[encoding] = compress(self.body, encoding)
+        return data
+
+    def response(self, encoding: str | None) -> Response:
+        if encoding is None or len(self.body) < COMPRESSION_MIN_SIZE:
+            return Response(content=self.body, media_type=self.media_type)
+
+        return Response(
+            content=self.encoded(encoding),
+            media_type=self.media_type,
+            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+        )
+
+
+class VersionedResponseCache:
+    """
+    Serialized responses keyed by request parameters, valid for one data
+    version. Writers call bump() after committing a change; entries also
+    expire after `ttl` seconds so changes made outside this process (e.g.
+    admin.py) show up.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._entries: dict[Hashable, tuple[int, float, CachedPayload]] = {}
+        self._lock = threading.Lock()
+
+    def bump(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def get(self, key: Hashable, build: Callable[[], bytes]) -> CachedPayload:
+        version = self.version
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version and time.monotonic() - entry[1] < self.ttl:
+            return entry[2]
+
+        payload = CachedPayload(build())
+
+        with self._lock:
+            # Don't store a payload built from data that a writer has since changed
+            if self.version == version:
+                self._entries[key] = (version, time.monotonic(), payload)
+
+        return payload
+
+
+market_cache = VersionedResponseCache(ttl=float(os.getenv("MARKET_CACHE_TTL_SECONDS", "5")))
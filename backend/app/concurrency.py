@@ -0,0 +1,95 @@
+"""
+Optimistic concurrency for writers of versioned rows (User, Market, Position).
+
+Each of those rows carries a version_id that SQLAlchemy checks and bumps
+on every UPDATE. If another transaction changed the row since it was
+read, the flush raises StaleDataError instead of silently overwriting
+yes_price or balance. run_with_retry rolls back and re-runs the whole
+unit of work after a jittered backoff.
+"""
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Callable, TypeVar
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+
+MAX_ATTEMPTS = int(os.getenv("OCC_MAX_ATTEMPTS", "5"))
+BASE_DELAY_MS = float(os.getenv("OCC_BASE_DELAY_MS", "5"))
+MAX_DELAY_MS = float(os.getenv("OCC_MAX_DELAY_MS", "100"))
+
+T = TypeVar("T")
+
+
+class ConcurrencyConflict(Exception):
+    """A write kept conflicting with concurrent updates after every retry."""
+
+
+class ContentionStats:
+    """Conflict and retry counters per operation, plus conflicts per key (e.g. market id)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.operations: dict[str, Counter] = {}
+            self.keys: Counter = Counter()
+
+    def record(self, operation: str, event: str, key: int | None = None):
+        with self._lock:
+            counters = self.operations.setdefault(operation, Counter())
+            counters[event] += 1
+            if event == "conflicts" and key is not None:
+                self.keys[key] += 1
+
+    def snapshot(self, top: int = 10) -> dict:
+        with self._lock:
+            return {
+                "operations": {
+                    operation: {
+                        event: counters[event]
+                        for event in ("attempts", "conflicts", "retries", "exhausted")
+                    }
+                    for operation, counters in self.operations.items()
+                },
+                "hot_keys": [
+                    {"key": key, "conflicts": conflicts}
+                    for key, conflicts in self.keys.most_common(top)
+                ],
+            }
+
+
+contention = ContentionStats()
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full jitter: uniform in [0, min(max, base * 2^attempt)] milliseconds, in seconds."""
+    return random.uniform(0, min(MAX_DELAY_MS, BASE_DELAY_MS * 2 ** attempt)) / 1000
+
+
+def run_with_retry(db: Session, operation: str, work: Callable[[], T], key: int | None = None) -> T:
+    """
+    Run `work` (which must re-read what it changes and commit) until it
+    commits without a version conflict, up to MAX_ATTEMPTS times.
+    Raises ConcurrencyConflict once attempts run out.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        contention.record(operation, "attempts")
+        try:
+            return work()
+        except StaleDataError:
+            db.rollback()
+            contention.record(operation, "conflicts", key)
+
+        if attempt + 1 < MAX_ATTEMPTS:
+            contention.record(operation, "retries")
+            time.sleep(backoff_delay(attempt))
+
+    contention.record(operation, "exhausted")
+    raise ConcurrencyConflict(f"{operation} conflicted with concurrent updates {MAX_ATTEMPTS} times")
@@ -0,0 +1,17 @@
+"""Loads .env once for the whole app; import before reading settings from os.environ."""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Create/upgrade the schema when a worker boots. Turn off in production and
+# run `python migrate.py` once per deploy instead.
+MIGRATE_ON_STARTUP = env_flag("MIGRATE_ON_STARTUP", True)
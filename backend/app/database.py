@@ -1,19 +1,64 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+import itertools
 import os
-from dotenv import load_dotenv
+import threading
+import time
 
-load_dotenv()
+from . import config  # noqa: F401  (loads .env)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./college_market.db")
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Comma-separated read replica URLs; empty means every read goes to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# How long after a user's own write their reads stay on the primary
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# How long a replica that failed is skipped before being tried again
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+
+def make_engine(url: str):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False} if "sqlite" in url else {}
+    )
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """The primary engine, created on first use rather than at import."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = make_engine(DATABASE_URL)
+    return _engine
+
+
+def __getattr__(name):
+    # Keeps `from app.database import engine` working without building it at import
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(name)
+
+
+class LazySessionmaker(sessionmaker):
+    """sessionmaker that binds to the primary engine the first time it is called."""
+
+    def __call__(self, **local_kw) -> Session:
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = LazySessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
@@ -22,4 +67,95 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class ReplicaSession(Session):
+    """
+    Read-only session on a replica. If a query fails there mid-request, the
+    replica is marked down and the query runs again on the primary, where
+    the rest of the request then stays.
+    """
+
+    router: "ReadRouter | None" = None
+    replica: int | None = None
+
+    def execute(self, *args, **kwargs):
+        try:
+            return super().execute(*args, **kwargs)
+        except OperationalError:
+            if self.replica is None:
+                raise
+            self.router.mark_down(self.replica)
+            self.replica = None
+            self.rollback()
+            self.bind = get_engine()
+        return super().execute(*args, **kwargs)
+
+
+class ReadRouter:
+    """
+    Hands out read-only sessions on the replicas in round-robin order.
+
+    A replica that fails to connect (or errors mid-request) is skipped for
+    REPLICA_RETRY_SECONDS; when no replica is usable, reads fall back to
+    the primary.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self._replicas: list[sessionmaker] | None = None
+        self._turn = itertools.count()
+        self._down_until: dict[int, float] = {}
+
+    @property
+    def replicas(self) -> list[sessionmaker]:
+        # Replica engines are built on the first read, not at import
+        if self._replicas is None:
+            self._replicas = [
+                sessionmaker(class_=ReplicaSession, autocommit=False, autoflush=False, bind=make_engine(url))
+                for url in self.urls
+            ]
+        return self._replicas
+
+    def session(self) -> tuple[Session, int | None]:
+        """Return (session, replica index), or (primary session, None)."""
+        count = len(self.urls)
+        if count:
+            start = next(self._turn)
+            now = time.monotonic()
+            for offset in range(count):
+                index = (start + offset) % count
+                if self._down_until.get(index, 0) > now:
+                    continue
+                db = self.replicas[index]()
+                try:
+                    db.connection()
+                except OperationalError:
+                    db.close()
+                    self.mark_down(index)
+                    continue
+                db.router, db.replica = self, index
+                return db, index
+
+        return SessionLocal(), None
+
+    def mark_down(self, index: int) -> None:
+        self._down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+read_router = ReadRouter([url.strip() for url in DATABASE_READ_URL.split(",") if url.strip()])
+
+
+def get_read_db():
+    """Session for read-only handlers: a replica when one is configured and healthy."""
+    db, replica = read_router.session()
+    try:
+        yield db
+    except OperationalError:
+        # Failures outside execute() still take the replica out of rotation
+        if replica is not None and db.replica is not None:
+            read_router.mark_down(replica)
+        raise
+    finally:
+        db.close()
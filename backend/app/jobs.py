@@ -0,0 +1,62 @@
+import logging
+import threading
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """
+    Run `func(db)` every `interval` seconds on a daemon thread, each run with
+    its own session. An interval of 0 or less disables the job. With
+    `run_at_start` the first run happens as soon as the thread starts,
+    off the startup path.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        func: Callable[[Session], object],
+        run_at_start: bool = False
+    ):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_at_start = run_at_start
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def run_once(self):
+        db = SessionLocal()
+        try:
+            return self.func(db)
+        except Exception:
+            db.rollback()
+            logger.exception("Job %s failed", self.name)
+        finally:
+            db.close()
+
+    def _run(self):
+        if self.run_at_start:
+            self.run_once()
+        while not self._stop.wait(self.interval):
+            self.run_once()
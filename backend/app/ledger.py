@@ -0,0 +1,221 @@
+import os
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import func, select, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+
+from .models import User, LedgerEntry, LedgerEntryType, BalanceSnapshot
+
+
+STARTING_BALANCE = 1000000  # cents
+
+GRANTS_ACCOUNT = "platform:grants"
+OPENING_ACCOUNT = "platform:opening"
+
+# Snapshots only cover entries older than this, so a transaction that was
+# still open when the snapshot ran can't be skipped over
+SNAPSHOT_LAG_SECONDS = float(os.getenv("BALANCE_SNAPSHOT_LAG_SECONDS", "300"))
+
+
+def user_account(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def market_account(market_id: int) -> str:
+    """Escrow account holding the cost of shares bought in a market."""
+    return f"market:{market_id}"
+
+
+def post_transfer(
+    db: Session,
+    user: User,
+    amount: int,
+    entry_type: LedgerEntryType,
+    counter_account: str,
+    market_id: int | None = None,
+) -> None:
+    """
+    Move `amount` cents into (positive) or out of (negative) a user's balance
+    and journal it against `counter_account`.
+
+    This is the only place User.balance should change. The caller commits,
+    so the balance update and both ledger legs land in the same transaction.
+    """
+    if user.id is None:
+        db.flush()
+
+    user.balance += amount
+
+    journal_id = uuid4().hex
+    db.add_all([
+        LedgerEntry(
+            journal_id=journal_id,
+            account=user_account(user.id),
+            user_id=user.id,
+            market_id=market_id,
+            entry_type=entry_type,
+            amount=amount,
+        ),
+        LedgerEntry(
+            journal_id=journal_id,
+            account=counter_account,
+            market_id=market_id,
+            entry_type=entry_type,
+            amount=-amount,
+        ),
+    ])
+
+
+def balance_at(db: Session, user_id: int, at: datetime) -> int:
+    """
+    Reconstruct a user's balance at time `at` from the latest snapshot
+    covering a time before it plus the ledger entries created after that.
+    """
+    snapshot = db.query(BalanceSnapshot).filter(
+        BalanceSnapshot.user_id == user_id,
+        BalanceSnapshot.taken_at <= at
+    ).order_by(BalanceSnapshot.taken_at.desc()).first()
+
+    query = db.query(func.coalesce(func.sum(LedgerEntry.amount), 0)).filter(
+        LedgerEntry.user_id == user_id,
+        LedgerEntry.created_at <= at
+    )
+
+    if snapshot is None:
+        return query.scalar()
+
+    return snapshot.balance + query.filter(LedgerEntry.created_at > snapshot.taken_at).scalar()
+
+
+def take_balance_snapshots(
+    db: Session,
+    min_new_entries: int = 1,
+    now: datetime | None = None,
+    lag: timedelta = timedelta(seconds=SNAPSHOT_LAG_SECONDS)
+) -> int:
+    """
+    Snapshot every user with at least `min_new_entries` ledger entries since
+    their previous snapshot. Runs as one grouped query over the new entries
+    only; returns the number of snapshots written.
+
+    A snapshot covers entries created up to `now - lag` and is stamped with
+    that time. Watermarking by time rather than by max(id) matters on MVCC
+    databases: a lower id can still be uncommitted when the snapshot runs,
+    and would otherwise be skipped for good.
+    """
+    covered_until = (now or datetime.utcnow()) - lag
+
+    latest_ids = select(
+        func.max(BalanceSnapshot.id).label("id")
+    ).group_by(BalanceSnapshot.user_id).subquery()
+
+    latest = select(
+        BalanceSnapshot.user_id,
+        BalanceSnapshot.balance,
+        BalanceSnapshot.taken_at
+    ).join(latest_ids, BalanceSnapshot.id == latest_ids.c.id).subquery()
+
+    rows = db.execute(
+        select(
+            LedgerEntry.user_id,
+            func.coalesce(latest.c.balance, 0),
+            func.sum(LedgerEntry.amount),
+            func.max(LedgerEntry.id)
+        )
+        .outerjoin(latest, latest.c.user_id == LedgerEntry.user_id)
+        .where(
+            LedgerEntry.user_id.is_not(None),
+            LedgerEntry.created_at <= covered_until,
+            or_(latest.c.taken_at.is_(None), LedgerEntry.created_at > latest.c.taken_at)
+        )
+        .group_by(LedgerEntry.user_id, latest.c.balance)
+        .having(func.count(LedgerEntry.id) >= min_new_entries)
+    ).all()
+
+    db.add_all([
+        BalanceSnapshot(
+            user_id=user_id,
+            balance=previous + delta,
+            last_entry_id=last_entry_id,
+            taken_at=covered_until
+        )
+        for user_id, previous, delta, last_entry_id in rows
+    ])
+    db.commit()
+
+    return len(rows)
+
+
+def reconcile_balances(db: Session, batch_size: int = 1000) -> tuple[int, list[tuple[int, str, int, int]]]:
+    """
+    Check every user's stored balance against the sum of their ledger entries
+    in one streaming pass.
+
+    Returns (users_checked, mismatches) where each mismatch is
+    (user_id, username, stored_balance, ledger_balance).
+    """
+    ledger_totals = select(
+        LedgerEntry.user_id,
+        func.sum(LedgerEntry.amount).label("total")
+    ).where(LedgerEntry.user_id.is_not(None)).group_by(LedgerEntry.user_id).subquery()
+
+    rows = db.execute(
+        select(
+            User.id,
+            User.username,
+            User.balance,
+            func.coalesce(ledger_totals.c.total, 0)
+        )
+        .outerjoin(ledger_totals, ledger_totals.c.user_id == User.id)
+        .order_by(User.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    checked = 0
+    mismatches = []
+    for user_id, username, balance, ledger_balance in rows:
+        checked += 1
+        if balance != ledger_balance:
+            mismatches.append((user_id, username, balance, ledger_balance))
+
+    return checked, mismatches
+
+
+def post_opening_balances(db: Session) -> int:
+    """
+    Journal the part of each user's balance the ledger doesn't account for
+    (balance minus the sum of their entries) as an OPENING entry. Covers
+    accounts created before the ledger existed, including ones that have
+    traded since. Users with an OPENING entry are never opened twice.
+    Returns the number of users opened.
+    """
+    has_opening = select(LedgerEntry.id).where(
+        LedgerEntry.user_id == User.id,
+        LedgerEntry.entry_type == LedgerEntryType.OPENING
+    ).exists()
+
+    ledger_totals = select(
+        LedgerEntry.user_id,
+        func.sum(LedgerEntry.amount).label("total")
+    ).where(LedgerEntry.user_id.is_not(None)).group_by(LedgerEntry.user_id).subquery()
+    ledger_balance = func.coalesce(ledger_totals.c.total, 0)
+
+    rows = (
+        db.query(User, ledger_balance)
+        .outerjoin(ledger_totals, ledger_totals.c.user_id == User.id)
+        .filter(~has_opening, User.balance != ledger_balance)
+        .all()
+    )
+
+    for user, covered in rows:
+        opening = user.balance - covered
+        user.balance -= opening
+        post_transfer(db, user, opening, LedgerEntryType.OPENING, OPENING_ACCOUNT)
+        # The balance nets out unchanged; writing it anyway checks the row's
+        # version, so two concurrent runs can't both open the same user
+        flag_modified(user, "balance")
+
+    db.commit()
+    return len(rows)
@@ -1,20 +1,52 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
-from datetime import datetime
-
-from .database import engine, get_db, Base
-from .models import User, Market, Position, Transaction, MarketStatus, OutcomeType, TransactionType, MarketCategory
+import os
+from typing import Literal
+from datetime import datetime, timedelta
+
+from .config import MIGRATE_ON_STARTUP
+from .database import SessionLocal, get_db, get_read_db
+from .migrations import migrate
+from .models import (
+    User, Market, MarketStats, MarketOutcome, Position, Transaction,
+    MarketStatus, MarketType, OutcomeType, TransactionType, MarketCategory, LedgerEntryType
+)
 from .schemas import (
     UserCreate, UserLogin, UserResponse, TokenResponse,
     MarketCreate, MarketResponse, MarketResolve,
-    TradeRequest, TradeResponse,
-    PositionResponse, TransactionResponse, PortfolioSummary
+    MultiMarketCreate, MultiMarketResponse, MarketOutcomeResponse, OutcomeQuote, MultiMarketResolve,
+    TradeRequest, MultiTradeRequest, TradeResponse, ProfilerConfig,
+    PositionResponse, TransactionResponse, TransactionSummaryResponse, PortfolioSummary, PortfolioHistoryPoint
 )
 from .auth import (
-    hash_password, authenticate_user, create_access_token, get_current_user
+    hash_password, authenticate_user, create_access_token, get_current_user, get_admin_user,
+    get_user_read_db
+)
+from .ledger import post_transfer, market_account, take_balance_snapshots, STARTING_BALANCE, GRANTS_ACCOUNT
+from .settlement import settle_market
+from .market_stats import record_fill
+from .search import search_index
+from .serialization import (
+    json_response, dump_markets, dump_portfolio, dump_transactions, dump_transaction_summaries,
+    dump_portfolio_history, transaction_cursor
+)
+from .portfolio_history import run_portfolio_snapshot_job
+from .pricing import (
+    price_after_buy, average_cost_after_buy,
+    initial_outcome_prices, outcome_prices_after_buy, quote_outcomes
 )
+from .scheduler import market_scheduler
+from .concurrency import run_with_retry, contention, ConcurrencyConflict
+from .compression import CompressionMiddleware, negotiate
+from .cache import market_cache
+from .risk import risk_book
+from .archival import archive_transactions
+from .profiling import profiler
+from .quotes import quote_board
+from .jobs import PeriodicJob
 
 
 app = FastAPI(title="College Market API", version="1.0.0")
@@ -28,10 +60,108 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
+
+@app.exception_handler(ConcurrencyConflict)
+def concurrency_conflict_handler(request: Request, exc: ConcurrencyConflict):
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "The market is busy, please try again"}
+    )
+
+balance_snapshot_job = PeriodicJob(
+    "balance-snapshots",
+    float(os.getenv("BALANCE_SNAPSHOT_INTERVAL_SECONDS", "3600")),
+    take_balance_snapshots
+)
+
+portfolio_snapshot_job = PeriodicJob(
+    "portfolio-snapshots",
+    float(os.getenv("PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS", "3600")),
+    run_portfolio_snapshot_job
+)
+
+# Picks up markets created or deleted outside the API (e.g. admin.py)
+search_index_job = PeriodicJob(
+    "search-index",
+    float(os.getenv("SEARCH_INDEX_REBUILD_INTERVAL_SECONDS", "300")),
+    search_index.rebuild,
+    run_at_start=True
+)
+
+# Reconciles this worker's quote board with the markets table, picking up
+# trades served by other workers and markets changed outside the API. Until
+# it runs, /markets/quotes on this worker misses those writes, so keep it short
+quote_board_job = PeriodicJob(
+    "quote-board",
+    float(os.getenv("QUOTE_BOARD_RELOAD_INTERVAL_SECONDS", "2")),
+    quote_board.load,
+    run_at_start=True
+)
+
+transaction_archive_job = PeriodicJob(
+    "transaction-archive",
+    float(os.getenv("TRANSACTION_ARCHIVE_INTERVAL_SECONDS", "86400")),
+    archive_transactions
+)
+
+# Reseeds the risk book, correcting any drift from trades or resolutions
+# made outside the API
+risk_book_job = PeriodicJob(
+    "risk-book",
+    float(os.getenv("RISK_BOOK_RELOAD_INTERVAL_SECONDS", "300")),
+    risk_book.load,
+    run_at_start=True
+)
+
+
+def on_markets_closed(closed_ids: list[int], resolved_ids: list[int]):
+    market_cache.bump()
+    for market_id in closed_ids:
+        search_index.update_status(market_id, MarketStatus.CLOSED.value)
+        quote_board.update_status(market_id, MarketStatus.CLOSED)
+    for market_id in resolved_ids:
+        search_index.update_status(market_id, MarketStatus.RESOLVED.value)
+        quote_board.update_status(market_id, MarketStatus.RESOLVED)
+        risk_book.drop(market_id)
+
+
+market_scheduler.listeners.append(on_markets_closed)
+
+
 @app.on_event("startup")
 def startup_event():
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created!")
+    if MIGRATE_ON_STARTUP:
+        added = migrate()
+        print("Database tables created!")
+        if added:
+            print(f"Added columns: {', '.join(added)}")
+    
+    # Endpoints can be sampled by the profiler once an admin enables it
+    profiler.install(app)
+    
+    # Everything below warms up on background threads so the worker can
+    # take requests immediately
+    market_scheduler.start(load=True)
+    balance_snapshot_job.start()
+    portfolio_snapshot_job.start()
+    search_index_job.start()
+    risk_book_job.start()
+    quote_board_job.start()
+    transaction_archive_job.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    market_scheduler.stop()
+    balance_snapshot_job.stop()
+    portfolio_snapshot_job.stop()
+    search_index_job.stop()
+    risk_book_job.stop()
+    quote_board_job.stop()
+    transaction_archive_job.stop()
+    profiler.disable()
 
 
 
@@ -52,10 +182,11 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         username=user_data.username.lower(),
         email=user_data.email,
         hashed_password=hash_password(user_data.password),
-        balance=1000000  
+        balance=0
     )
     
     db.add(new_user)
+    post_transfer(db, new_user, STARTING_BALANCE, LedgerEntryType.GRANT, GRANTS_ACCOUNT)
     db.commit()
     db.refresh(new_user)
     
@@ -92,18 +223,70 @@ def get_me(user: User = Depends(get_current_user)):
 
 @app.get("/markets", response_model=list[MarketResponse])
 def get_markets(
+    request: Request,
+    category: MarketCategory | None = Query(default=None),
+    db: Session = Depends(get_db)
+):
+    # Built on the primary: a lagging replica would be cached as the
+    # version a writer just bumped to
+    payload = market_cache.get(("markets", category), lambda: dump_markets(db, category))
+    return payload.response(negotiate(request.headers.get("accept-encoding")))
+
+
+@app.get("/markets/search", response_model=list[MarketResponse])
+def search_markets(
+    q: str = Query(..., min_length=1, max_length=100),
+    status: MarketStatus | None = Query(default=None),
     category: MarketCategory | None = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Market)
-    if category:
-        query = query.filter(Market.category == category)
-    markets = query.all()
-    return markets
+    """Search markets by college name and description, best matches first."""
+    search_index.ensure_built(db)
+    market_ids = search_index.search(
+        q,
+        status=status.value if status else None,
+        category=category.value if category else None,
+        limit=limit
+    )
+    if not market_ids:
+        return []
+    
+    markets = {m.id: m for m in db.query(Market).filter(Market.id.in_(market_ids)).all()}
+    
+    # Markets deleted since the index was built drop out here
+    for market_id in market_ids:
+        if market_id not in markets:
+            search_index.remove(market_id)
+    
+    return [markets[market_id] for market_id in market_ids if market_id in markets]
+
+
+@app.get("/markets/quotes")
+def get_quotes(
+    request: Request,
+    since: int | None = Query(default=None, ge=0),
+    epoch: int | None = Query(default=None, ge=0),
+    fmt: Literal["json", "binary"] = Query(default="json", alias="format")
+):
+    """
+    (id, yes_price, no_price, status) for every market, or with `since`
+    (and the `epoch` it came from) only the markets changed after that
+    version. See app/quotes.py for the binary layout.
+    """
+    if not quote_board.loaded:
+        db = SessionLocal()
+        try:
+            quote_board.load(db)
+        finally:
+            db.close()
+    
+    payload = quote_board.snapshot(since, binary=fmt == "binary", epoch=epoch)
+    return payload.response(negotiate(request.headers.get("accept-encoding")))
 
 
 @app.get("/markets/{market_id}", response_model=MarketResponse)
-def get_market(market_id: int, db: Session = Depends(get_db)):
+def get_market(market_id: int, db: Session = Depends(get_read_db)):
     """Get a specific market."""
     market = db.query(Market).filter(Market.id == market_id).first()
     
@@ -126,13 +309,112 @@ def create_market(
         no_price=market_data.no_price,
         status=MarketStatus.OPEN,
         category=MarketCategory(market_data.category),
+        close_at=market_data.close_at,
+        resolve_at=market_data.resolve_at,
+        stats=MarketStats(
+            trade_count=0,
+            traded_notional=0,
+            unique_traders=0,
+            open_interest=0,
+            volume_buckets=[]
+        ),
     )
     db.add(new_market)
     db.commit()
     db.refresh(new_market)
+    market_cache.bump()
+    search_index.add(new_market)
+    quote_board.update(new_market.id, new_market.yes_price, new_market.no_price, new_market.status)
+    market_scheduler.schedule(new_market)
     return new_market
 
 
+@app.post("/markets/multi", response_model=MultiMarketResponse, status_code=status.HTTP_201_CREATED)
+def create_multi_market(
+    market_data: MultiMarketCreate,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Create a market with one outcome per label."""
+    prices = market_data.prices or initial_outcome_prices(len(market_data.outcomes))
+    favourite_price = max(prices)
+    
+    new_market = Market(
+        college_name=market_data.college_name,
+        description=market_data.description,
+        yes_price=favourite_price,
+        no_price=100 - favourite_price,
+        status=MarketStatus.OPEN,
+        category=MarketCategory(market_data.category),
+        market_type=MarketType.MULTI,
+        close_at=market_data.close_at,
+        resolve_at=market_data.resolve_at,
+        stats=MarketStats(
+            trade_count=0,
+            traded_notional=0,
+            unique_traders=0,
+            open_interest=0,
+            volume_buckets=[]
+        ),
+        outcomes=[
+            MarketOutcome(index=index, label=label, price=price, total_shares=0)
+            for index, (label, price) in enumerate(zip(market_data.outcomes, prices))
+        ],
+    )
+    db.add(new_market)
+    db.commit()
+    db.refresh(new_market)
+    market_cache.bump()
+    search_index.add(new_market)
+    quote_board.update(new_market.id, new_market.yes_price, new_market.no_price, new_market.status)
+    market_scheduler.schedule(new_market)
+    return new_market
+
+
+@app.get("/markets/{market_id}/outcomes", response_model=list[MarketOutcomeResponse])
+def get_market_outcomes(market_id: int, db: Session = Depends(get_read_db)):
+    """Get the outcomes of a multi-outcome market with their current prices."""
+    outcomes = db.query(MarketOutcome).filter(
+        MarketOutcome.market_id == market_id
+    ).order_by(MarketOutcome.index).all()
+    
+    if not outcomes:
+        raise HTTPException(status_code=404, detail="Multi-outcome market not found")
+    
+    return outcomes
+
+
+@app.get("/markets/{market_id}/quote", response_model=list[OutcomeQuote])
+def quote_market(
+    market_id: int,
+    shares: int = Query(default=100, gt=0, le=10000),
+    db: Session = Depends(get_read_db)
+):
+    """Quote buying `shares` of every outcome of a multi-outcome market at once."""
+    outcomes = db.query(MarketOutcome).filter(
+        MarketOutcome.market_id == market_id
+    ).order_by(MarketOutcome.index).all()
+    
+    if not outcomes:
+        raise HTTPException(status_code=404, detail="Multi-outcome market not found")
+    
+    quote = quote_outcomes([outcome.price for outcome in outcomes], shares)
+    
+    return [
+        OutcomeQuote(
+            index=outcome.index,
+            label=outcome.label,
+            price=outcome.price,
+            cost=cost,
+            price_after=price_after,
+            profit_if_wins=profit_if_wins
+        )
+        for outcome, cost, price_after, profit_if_wins in zip(
+            outcomes, quote["cost"], quote["price_after"], quote["profit_if_wins"]
+        )
+    ]
+
+
 @app.post("/markets/{market_id}/resolve", response_model=MarketResponse)
 def resolve_market(
     market_id: int,
@@ -141,30 +423,76 @@ def resolve_market(
     user: User = Depends(get_current_user)
 ):
     """Resolve a market and pay out winners."""
+    return run_with_retry(
+        db, "resolve",
+        lambda: apply_resolution(db, market_id, resolution.outcome, resolution.resolve_at),
+        key=market_id
+    )
+
+
+@app.post("/markets/{market_id}/resolve-outcome", response_model=MarketResponse)
+def resolve_multi_market(
+    market_id: int,
+    resolution: MultiMarketResolve,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Resolve a multi-outcome market to one of its outcomes and pay out winners."""
+    return run_with_retry(
+        db, "resolve",
+        lambda: apply_resolution(db, market_id, resolution.outcome, resolution.resolve_at, MarketType.MULTI),
+        key=market_id
+    )
+
+
+def require_market_type(market: Market, market_type: MarketType) -> None:
+    if market.market_type != market_type:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Market {market.id} is a {market.market_type.value} market"
+        )
+
+
+def apply_resolution(
+    db: Session,
+    market_id: int,
+    outcome: str,
+    resolve_at: datetime | None,
+    market_type: MarketType = MarketType.BINARY
+) -> Market:
+    """Resolve (or schedule the resolution of) a market and commit."""
     
     market = db.query(Market).filter(Market.id == market_id).first()
     if not market:
         raise HTTPException(status_code=404, detail="Market not found")
     
+    require_market_type(market, market_type)
+    
     if market.status == MarketStatus.RESOLVED:
         raise HTTPException(status_code=400, detail="Market already resolved")
     
-    # Resolve market
-    market.status = MarketStatus.RESOLVED
-    market.resolved_outcome = resolution.outcome
-    market.resolution_date = datetime.utcnow()
+    if market_type == MarketType.MULTI and outcome not in {o.label for o in market.outcomes}:
+        raise HTTPException(status_code=400, detail=f"Market has no outcome '{outcome}'")
     
-    # Pay out winners
-    positions = db.query(Position).filter(Position.market_id == market_id).all()
+    # Schedule the resolution for later
+    if resolve_at is not None and resolve_at > datetime.utcnow():
+        market.pending_outcome = outcome
+        market.resolve_at = resolve_at
+        db.commit()
+        db.refresh(market)
+        market_cache.bump()
+        market_scheduler.schedule(market)
+        return market
     
-    for position in positions:
-        if position.shares > 0 and position.outcome.value == resolution.outcome:
-            # Winner! Each share pays 100 cents
-            payout = position.shares * 100
-            position.user.balance += payout
+    # Resolve market and pay out winners
+    settle_market(db, market, outcome)
     
     db.commit()
     db.refresh(market)
+    market_cache.bump()
+    search_index.update_status(market.id, market.status.value)
+    quote_board.update_status(market.id, market.status)
+    risk_book.drop(market.id)
     
     return market
 
@@ -178,13 +506,29 @@ def execute_trade(
 ):
     """Execute a trade (buy shares at current market price)."""
     
+    # Markets the scheduler has closed are rejected before touching the database
+    if market_scheduler.is_closed(trade.market_id):
+        raise HTTPException(status_code=400, detail="Market is not open for trading")
+    
+    response = run_with_retry(
+        db, "trade", lambda: fill_order(db, user, trade), key=trade.market_id
+    )
+    return response
+
+
+def fill_order(db: Session, user: User, trade: TradeRequest) -> TradeResponse:
+    """
+    Fill a buy order at the current market price and commit. Re-reads the
+    market, so it can be re-run after a version conflict.
+    """
+    
     # Get market
     market = db.query(Market).filter(Market.id == trade.market_id).first()
     if not market:
         raise HTTPException(status_code=404, detail="Market not found")
     
-    if market.status != MarketStatus.OPEN:
-        raise HTTPException(status_code=400, detail="Market is not open for trading")
+    require_market_type(market, MarketType.BINARY)
+    require_open(market)
     
     # Get current price for the outcome
     current_price = market.yes_price if trade.outcome == "YES" else market.no_price
@@ -193,32 +537,37 @@ def execute_trade(
     total_cost = trade.shares * current_price
     
     # Check user has enough balance
-    if user.balance < total_cost:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Insufficient balance. Need {total_cost} cents, have {user.balance} cents"
-        )
+    require_balance(user, total_cost)
     
-    # Deduct from user balance
-    user.balance -= total_cost
+    # Deduct from user balance into the market's escrow
+    post_transfer(
+        db, user, -total_cost, LedgerEntryType.TRADE,
+        market_account(market.id), market_id=market.id
+    )
+    # Keeps the user's next reads on the primary (see get_user_read_db)
+    user.last_write_at = datetime.utcnow()
     
-    # Find or create position
-    position = db.query(Position).filter(
+    # Find or create position (load both outcomes to tell if this is the
+    # user's first trade in the market)
+    market_positions = db.query(Position).filter(
         and_(
             Position.user_id == user.id,
-            Position.market_id == market.id,
-            Position.outcome == OutcomeType(trade.outcome)
+            Position.market_id == market.id
         )
-    ).first()
+    ).all()
+    new_trader = not market_positions
+    position = next(
+        (p for p in market_positions if p.outcome == OutcomeType(trade.outcome)), None
+    )
+    
+    new_holder = position is None
     
     if position:
         # Update existing position (calculate new average cost)
-        total_shares = position.shares + trade.shares
-        total_cost_basis = (position.shares * position.average_cost) + (trade.shares * current_price)
-        new_average_cost = total_cost_basis // total_shares  # Integer division
-        
-        position.shares = total_shares
-        position.average_cost = new_average_cost
+        position.average_cost = average_cost_after_buy(
+            position.shares, position.average_cost, trade.shares, current_price
+        )
+        position.shares += trade.shares
     else:
         # Create new position
         position = Position(
@@ -248,21 +597,23 @@ def execute_trade(
     else:
         market.total_no_shares += trade.shares
     
-    # Simple price adjustment (can be refined later)
-    # For every 100 shares bought, increase price by 1 cent (max 99)
-    price_change = max(1, trade.shares // 100)
+    yes_price_before = market.yes_price
     
-    if trade.outcome == "YES":
-        market.yes_price = min(99, market.yes_price + price_change)
-        market.no_price = 100 - market.yes_price
-    else:
-        market.no_price = min(99, market.no_price + price_change)
-        market.yes_price = 100 - market.no_price
+    market.yes_price, market.no_price = price_after_buy(
+        market.yes_price, market.no_price, trade.outcome, trade.shares
+    )
+    
+    record_fill(db, market, trade.shares, total_cost, yes_price_before, new_trader)
     
+    db.flush()
+    market_version = market.version_id
     db.commit()
     db.refresh(position)
     db.refresh(transaction)
     db.refresh(market)
+    market_cache.bump()
+    quote_board.update(market.id, market.yes_price, market.no_price, market.status)
+    risk_book.record_fill(market.id, market_version, trade.outcome, trade.shares, total_cost, new_holder)
     
     # Build position response with calculated fields
     position_response = build_position_response(position, market)
@@ -279,79 +630,289 @@ def execute_trade(
     )
 
 
-
-@app.get("/portfolio", response_model=PortfolioSummary)
-def get_portfolio(
+@app.post("/trade/multi", response_model=TradeResponse)
+def execute_multi_trade(
+    trade: MultiTradeRequest,
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's complete portfolio with P&L calculations."""
+    """Buy shares of one outcome of a multi-outcome market at its current price."""
+    
+    if market_scheduler.is_closed(trade.market_id):
+        raise HTTPException(status_code=400, detail="Market is not open for trading")
     
-    positions = db.query(Position).filter(
-        and_(Position.user_id == user.id, Position.shares > 0)
+    response = run_with_retry(
+        db, "trade", lambda: fill_multi_order(db, user, trade), key=trade.market_id
+    )
+    return response
+
+
+def fill_multi_order(db: Session, user: User, trade: MultiTradeRequest) -> TradeResponse:
+    """
+    Fill a buy of one outcome and reprice the whole outcome vector, then
+    commit. Conflicts are caught on the market row, whose version moves
+    with every fill.
+    """
+    
+    market = db.query(Market).filter(Market.id == trade.market_id).first()
+    if not market:
+        raise HTTPException(status_code=404, detail="Market not found")
+    
+    require_market_type(market, MarketType.MULTI)
+    require_open(market)
+    
+    outcomes = market.outcomes
+    if trade.outcome_index >= len(outcomes):
+        raise HTTPException(status_code=404, detail="Outcome not found")
+    outcome = outcomes[trade.outcome_index]
+    
+    current_price = outcome.price
+    total_cost = trade.shares * current_price
+    
+    require_balance(user, total_cost)
+    
+    # Deduct from user balance into the market's escrow
+    post_transfer(
+        db, user, -total_cost, LedgerEntryType.TRADE,
+        market_account(market.id), market_id=market.id
+    )
+    # Keeps the user's next reads on the primary (see get_user_read_db)
+    user.last_write_at = datetime.utcnow()
+    
+    # Find or create the position in this outcome
+    market_positions = db.query(Position).filter(
+        and_(
+            Position.user_id == user.id,
+            Position.market_id == market.id
+        )
     ).all()
+    new_trader = not market_positions
+    position = next((p for p in market_positions if p.outcome_id == outcome.id), None)
+    new_holder = position is None
+    
+    if position:
+        position.average_cost = average_cost_after_buy(
+            position.shares, position.average_cost, trade.shares, current_price
+        )
+        position.shares += trade.shares
+    else:
+        position = Position(
+            user_id=user.id,
+            market_id=market.id,
+            outcome=OutcomeType.YES,
+            outcome_id=outcome.id,
+            shares=trade.shares,
+            average_cost=current_price
+        )
+        db.add(position)
+    
+    transaction = Transaction(
+        user_id=user.id,
+        market_id=market.id,
+        transaction_type=TransactionType.BUY,
+        outcome=OutcomeType.YES,
+        outcome_id=outcome.id,
+        shares=trade.shares,
+        price_per_share=current_price,
+        total_cost=total_cost
+    )
+    db.add(transaction)
+    
+    # Update volume and reprice every outcome
+    outcome.total_shares += trade.shares
+    market.total_yes_shares += trade.shares
+    
+    yes_price_before = market.yes_price
     
-    position_responses = []
-    total_invested = 0
-    total_current_value = 0
-    
-    for position in positions:
-        market = db.query(Market).filter(Market.id == position.market_id).first()
-        position_response = build_position_response(position, market)
-        position_responses.append(position_response)
-        
-        total_invested += position_response.cost_basis
-        total_current_value += position_response.current_value
-    
-    total_pnl = total_current_value - total_invested
-    total_pnl_percent = (total_pnl / total_invested * 100) if total_invested > 0 else 0
-    
-    return PortfolioSummary(
-        balance=user.balance,
-        total_invested=total_invested,
-        total_current_value=total_current_value,
-        total_unrealized_pnl=total_pnl,
-        total_unrealized_pnl_percent=total_pnl_percent,
-        positions=position_responses
+    prices = outcome_prices_after_buy(
+        [o.price for o in outcomes], trade.outcome_index, trade.shares
     )
+    for o, price in zip(outcomes, prices):
+        o.price = price
+    market.yes_price = max(prices)
+    market.no_price = 100 - market.yes_price
+    
+    record_fill(db, market, trade.shares, total_cost, yes_price_before, new_trader)
+    
+    db.flush()
+    market_version = market.version_id
+    db.commit()
+    db.refresh(position)
+    db.refresh(transaction)
+    db.refresh(market)
+    market_cache.bump()
+    quote_board.update(market.id, market.yes_price, market.no_price, market.status)
+    risk_book.record_fill(
+        market.id, market_version, outcome.label, trade.shares, total_cost, new_holder, multi=True
+    )
+    
+    return TradeResponse(
+        success=True,
+        message=f"Successfully bought {trade.shares} {outcome.label} shares",
+        transaction_id=transaction.id,
+        shares=trade.shares,
+        price_per_share=current_price,
+        total_cost=total_cost,
+        new_balance=user.balance,
+        position=build_position_response(position, market, outcome)
+    )
+
+
+def require_open(market: Market) -> None:
+    # The row's own deadline covers the gap before the scheduler gets to it
+    if market.status != MarketStatus.OPEN or (
+        market.close_at is not None and market.close_at <= datetime.utcnow()
+    ):
+        raise HTTPException(status_code=400, detail="Market is not open for trading")
+
+
+def require_balance(user: User, total_cost: int) -> None:
+    if user.balance < total_cost:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient balance. Need {total_cost} cents, have {user.balance} cents"
+        )
+
+
+
+@app.get("/portfolio", response_model=PortfolioSummary)
+def get_portfolio(
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db)
+):
+    """Get user's complete portfolio with P&L calculations."""
+    return json_response(dump_portfolio(db, user))
+
+
+@app.get("/portfolio/history", response_model=list[PortfolioHistoryPoint])
+def get_portfolio_history(
+    days: int = Query(default=30, ge=1, le=3650),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get user's portfolio value over time from stored snapshots."""
+    since = datetime.utcnow() - timedelta(days=days)
+    return json_response(dump_portfolio_history(db, user, since))
 
 
 @app.get("/transactions", response_model=list[TransactionResponse])
 def get_transactions(
+    limit: int | None = Query(default=None, ge=1, le=1000),
+    before: int | None = Query(default=None, description="id of the last transaction on the previous page"),
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_read_db)
 ):
-    """Get user's transaction history."""
+    """Get user's transaction history, newest first, including archived transactions."""
+    cursor = None
+    if before is not None:
+        cursor = transaction_cursor(db, user, before)
+        if cursor is None:
+            raise HTTPException(status_code=400, detail="Unknown transaction in 'before'")
     
-    transactions = db.query(Transaction).filter(
-        Transaction.user_id == user.id
-    ).order_by(Transaction.timestamp.desc()).all()
+    return json_response(dump_transactions(db, user, limit, cursor))
+
+
+@app.get("/transactions/summary", response_model=list[TransactionSummaryResponse])
+def get_transaction_summaries(
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_user_read_db)
+):
+    """Per-market rollups of the user's archived transactions."""
+    return json_response(dump_transaction_summaries(db, user))
+
+
+
+@app.get("/admin/contention")
+def get_contention(user: User = Depends(get_admin_user)):
+    """Optimistic-concurrency conflict and retry counters since startup (or last reset)."""
+    return contention.snapshot()
+
+
+@app.delete("/admin/contention", status_code=status.HTTP_204_NO_CONTENT)
+def reset_contention(user: User = Depends(get_admin_user)):
+    contention.reset()
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+def get_profile(
+    kind: Literal["stacks", "sql"] = Query(default="stacks"),
+    user: User = Depends(get_admin_user)
+):
+    """
+    Collapsed stacks from the current (or last) profiling session, ready for
+    flamegraph.pl or speedscope. "stacks" counts samples; "sql" counts
+    microseconds spent per statement.
+    """
+    return PlainTextResponse(profiler.collapsed(kind))
+
+
+@app.get("/admin/profile/status")
+def get_profile_status(user: User = Depends(get_admin_user)):
+    return profiler.status()
+
+
+@app.post("/admin/profile")
+def start_profile(config: ProfilerConfig, user: User = Depends(get_admin_user)):
+    """Start a new profiling session for the given routes and/or a fraction of all requests."""
+    known = {route.path for route in app.routes}
+    unknown = [path for path in config.routes if path not in known]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown route(s): {', '.join(unknown)}")
     
-    transaction_responses = []
-    for transaction in transactions:
-        market = db.query(Market).filter(Market.id == transaction.market_id).first()
-        
-        transaction_responses.append(TransactionResponse(
-            id=transaction.id,
-            market_id=transaction.market_id,
-            transaction_type=transaction.transaction_type.value,
-            outcome=transaction.outcome.value,
-            shares=transaction.shares,
-            price_per_share=transaction.price_per_share,
-            total_cost=transaction.total_cost,
-            timestamp=transaction.timestamp,
-            market_college_name=market.college_name
-        ))
+    profiler.enable(config.routes, config.sample_rate, config.interval_ms / 1000)
+    return profiler.status()
+
+
+@app.delete("/admin/profile", status_code=status.HTTP_204_NO_CONTENT)
+def stop_profile(user: User = Depends(get_admin_user)):
+    """Stop profiling; the collected stacks stay readable until the next session."""
+    profiler.disable()
+
+
+@app.get("/admin/risk")
+def get_risk(
+    top: int = Query(default=20, ge=1, le=500),
+    user: User = Depends(get_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """Outstanding liabilities and net exposure across unresolved markets, worst first."""
+    risk_book.ensure_loaded(db)
+    return risk_book.summary(top)
+
+
+@app.get("/admin/risk/{market_id}")
+def get_market_risk(
+    market_id: int,
+    user: User = Depends(get_admin_user),
+    db: Session = Depends(get_read_db)
+):
+    """One market's exposure plus what resolving it to each outcome would pay out."""
+    market = db.get(Market, market_id)
+    if market is None:
+        raise HTTPException(status_code=404, detail="Market not found")
     
-    return transaction_responses
+    risk_book.ensure_loaded(db)
+    if market.market_type == MarketType.MULTI:
+        return {
+            **risk_book.exposure(market_id),
+            "if_outcome": {o.label: risk_book.preview(market_id, o.label) for o in market.outcomes},
+        }
+    return {
+        **risk_book.exposure(market_id),
+        "if_yes": risk_book.preview(market_id, "YES"),
+        "if_no": risk_book.preview(market_id, "NO"),
+    }
 
 
 
-def build_position_response(position: Position, market: Market) -> PositionResponse:
+def build_position_response(position: Position, market: Market, outcome: MarketOutcome | None = None) -> PositionResponse:
     """Build a PositionResponse with calculated P&L fields."""
     
     # Get current market price for this outcome
-    current_price = market.yes_price if position.outcome == OutcomeType.YES else market.no_price
+    if outcome is not None:
+        current_price = outcome.price
+    else:
+        current_price = market.yes_price if position.outcome == OutcomeType.YES else market.no_price
     
     # Calculate values
     cost_basis = position.shares * position.average_cost
@@ -362,7 +923,7 @@ def build_position_response(position: Position, market: Market) -> PositionRespo
     return PositionResponse(
         id=position.id,
         market_id=position.market_id,
-        outcome=position.outcome.value,
+        outcome=outcome.label if outcome is not None else position.outcome.value,
         shares=position.shares,
         average_cost=position.average_cost,
         current_value=current_value,
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .models import Market, MarketStats, Transaction, MarketStatus, current_bucket, live_buckets
+
+
+def get_or_create_stats(market: Market) -> MarketStats:
+    if market.stats is None:
+        market.stats = MarketStats(
+            market_id=market.id,
+            trade_count=0,
+            traded_notional=0,
+            unique_traders=0,
+            open_interest=0,
+            volume_buckets=[]
+        )
+    return market.stats
+
+
+def record_fill(
+    db: Session,
+    market: Market,
+    shares: int,
+    total_cost: int,
+    yes_price_before: int,
+    new_trader: bool
+) -> None:
+    """
+    Fold one fill into the market's stats. Call after the market's prices
+    have been moved by the trade; does not commit.
+    """
+    stats = get_or_create_stats(market)
+
+    stats.trade_count += 1
+    stats.traded_notional += total_cost
+    stats.open_interest += shares
+    if new_trader:
+        stats.unique_traders += 1
+
+    # Drop buckets that have left the window and add to the current one.
+    # The list is reassigned so the JSON column is flagged as changed.
+    hour = current_bucket()
+    buckets = [list(bucket) for bucket in live_buckets(stats.volume_buckets)]
+    if buckets and buckets[-1][0] == hour:
+        buckets[-1][1] += shares
+        buckets[-1][3] = market.yes_price
+    else:
+        buckets.append([hour, shares, yes_price_before, market.yes_price])
+    stats.volume_buckets = buckets
+
+    stats.updated_at = datetime.utcnow()
+
+
+def record_resolution(db: Session, market: Market) -> None:
+    """Resolved markets have no open interest left."""
+    stats = get_or_create_stats(market)
+    stats.open_interest = 0
+    stats.updated_at = datetime.utcnow()
+
+
+def backfill_market_stats(db: Session) -> int:
+    """
+    Create stats rows for markets that predate the market_stats table from
+    one grouped query over their transactions. Rolling 24h buckets start
+    empty. Returns the number of rows created.
+    """
+    has_stats = select(MarketStats.market_id).where(MarketStats.market_id == Market.id).exists()
+
+    rows = db.execute(
+        select(
+            Market.id,
+            Market.status,
+            func.count(Transaction.id),
+            func.coalesce(func.sum(Transaction.total_cost), 0),
+            func.count(func.distinct(Transaction.user_id)),
+            func.coalesce(func.sum(Transaction.shares), 0)
+        )
+        .outerjoin(Transaction, Transaction.market_id == Market.id)
+        .where(~has_stats)
+        .group_by(Market.id, Market.status)
+    ).all()
+
+    db.add_all([
+        MarketStats(
+            market_id=market_id,
+            trade_count=trade_count,
+            traded_notional=traded_notional,
+            unique_traders=unique_traders,
+            open_interest=0 if status == MarketStatus.RESOLVED else shares,
+            volume_buckets=[]
+        )
+        for market_id, status, trade_count, traded_notional, unique_traders, shares in rows
+    ])
+    db.commit()
+
+    return len(rows)
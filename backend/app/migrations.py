@@ -0,0 +1,67 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .concurrency import run_with_retry
+from .database import Base, SessionLocal, get_engine
+from .ledger import post_opening_balances
+from .market_stats import backfill_market_stats
+
+
+def upgrade(engine: Engine) -> list[str]:
+    """
+    Bring the schema up to date with the models: create missing tables and
+    add missing columns and indexes to existing ones. Only additive changes
+    are made, so new columns must be nullable or have a server_default.
+
+    Returns the "table.column" names that were added.
+    """
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    added = []
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    if isinstance(default, str):
+                        default = "'" + default.replace("'", "''") + "'"
+                    ddl += f" DEFAULT {default}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+
+                conn.execute(text(ddl))
+                added.append(f"{table.name}.{column.name}")
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+
+    return added
+
+
+def migrate() -> list[str]:
+    """
+    Everything a deploy needs before workers serve traffic: the schema
+    upgrade plus data backfills. Run via `python migrate.py`, or on worker
+    startup when MIGRATE_ON_STARTUP is on.
+    """
+    added = upgrade(get_engine())
+
+    db = SessionLocal()
+    try:
+        backfill_market_stats(db)
+        # Workers migrating at once race on the same users' balances
+        run_with_retry(db, "opening-balances", lambda: post_opening_balances(db))
+    finally:
+        db.close()
+
+    return added
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index, JSON
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
 import enum
 from .database import Base
 
@@ -14,10 +14,50 @@ class OutcomeType(str, enum.Enum):
     YES = "YES"
     NO = "NO"
 
+class MarketType(str, enum.Enum):
+    BINARY = "binary"    # YES/NO, priced by yes_price/no_price
+    MULTI = "multi"      # N outcomes, priced by its MarketOutcome rows
+
 class TransactionType(str, enum.Enum):
     BUY = "BUY"
     SELL = "SELL"
 
+class LedgerEntryType(str, enum.Enum):
+    GRANT = "GRANT"        # starting balance on registration
+    TRADE = "TRADE"        # cost of buying shares
+    PAYOUT = "PAYOUT"      # winnings on resolution
+    OPENING = "OPENING"    # backfilled balance for accounts that predate the ledger
+
+class SnapshotGranularity(str, enum.Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+
+STATS_BUCKET_SECONDS = 3600
+STATS_WINDOW_BUCKETS = 24
+
+
+def current_bucket(now: datetime | None = None) -> int:
+    now = now or datetime.utcnow()
+    return int(now.replace(tzinfo=timezone.utc).timestamp()) // STATS_BUCKET_SECONDS
+
+
+def live_buckets(buckets: list | None, now: datetime | None = None) -> list:
+    """Buckets that fall inside the rolling window ending now, oldest first."""
+    oldest = current_bucket(now) - STATS_WINDOW_BUCKETS + 1
+    return [bucket for bucket in buckets or [] if bucket[0] >= oldest]
+
+
+def window_volume(buckets: list | None) -> int:
+    return sum(bucket[1] for bucket in live_buckets(buckets))
+
+
+def window_price_change(buckets: list | None) -> int:
+    live = live_buckets(buckets)
+    if not live:
+        return 0
+    return live[-1][3] - live[0][2]
+
 
 class User(Base):
     __tablename__ = "users"
@@ -28,9 +68,13 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     balance = Column(Integer, default=1000000)  
     created_at = Column(DateTime, default=datetime.utcnow)
+    last_write_at = Column(DateTime, nullable=True)  # last trade; pins the user's reads to the primary
+    version_id = Column(Integer, nullable=False, server_default="1")
     
     positions = relationship("Position", back_populates="user", cascade="all, delete-orphan")
     transactions = relationship("Transaction", back_populates="user", cascade="all, delete-orphan")
+    
+    __mapper_args__ = {"version_id_col": version_id}
 
 
 class MarketCategory(str, enum.Enum):
@@ -52,6 +96,7 @@ class Market(Base):
     no_price = Column(Integer, nullable=False)
     
     category = Column(Enum(MarketCategory), nullable=False)
+    market_type = Column(Enum(MarketType), nullable=False, default=MarketType.BINARY, server_default=MarketType.BINARY.name)
     
     total_yes_shares = Column(Integer, default=0)
     total_no_shares = Column(Integer, default=0)
@@ -59,10 +104,75 @@ class Market(Base):
     resolved_outcome = Column(String, nullable=True)  
     resolution_date = Column(DateTime, nullable=True)
     
+    # Scheduled deadlines (UTC): trading stops at close_at; at resolve_at the
+    # market is resolved to pending_outcome if one has been set
+    close_at = Column(DateTime, nullable=True)
+    resolve_at = Column(DateTime, nullable=True)
+    pending_outcome = Column(String, nullable=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
+    version_id = Column(Integer, nullable=False, server_default="1")
     
     positions = relationship("Position", back_populates="market", cascade="all, delete-orphan")
     transactions = relationship("Transaction", back_populates="market", cascade="all, delete-orphan")
+    stats = relationship("MarketStats", back_populates="market", uselist=False, lazy="joined", cascade="all, delete-orphan")
+    outcomes = relationship("MarketOutcome", back_populates="market", order_by="MarketOutcome.index", cascade="all, delete-orphan")
+    
+    __mapper_args__ = {"version_id_col": version_id}
+
+
+class MarketStats(Base):
+    """
+    Per-market trading statistics, updated incrementally on every fill so
+    market listings never aggregate over transactions.
+    """
+    __tablename__ = "market_stats"
+    
+    market_id = Column(Integer, ForeignKey("markets.id"), primary_key=True)
+    
+    trade_count = Column(Integer, default=0)
+    traded_notional = Column(Integer, default=0)  # cents
+    unique_traders = Column(Integer, default=0)
+    open_interest = Column(Integer, default=0)  # outstanding shares, 0 once resolved
+    
+    # Hourly buckets for rolling 24h windows: [[hour, shares, open_yes_price, close_yes_price], ...]
+    volume_buckets = Column(JSON, default=list)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    market = relationship("Market", back_populates="stats")
+    
+    @property
+    def volume_24h(self) -> int:
+        return window_volume(self.volume_buckets)
+    
+    @property
+    def price_change_24h(self) -> int:
+        return window_price_change(self.volume_buckets)
+
+
+class MarketOutcome(Base):
+    """
+    One outcome of a multi-outcome market. Prices across a market's
+    outcomes always sum to 100 cents and each winning share pays 100.
+    For multi-outcome markets, yes_price on the market row mirrors the
+    favourite's price so listings stay meaningful.
+    """
+    __tablename__ = "market_outcomes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
+    index = Column(Integer, nullable=False)  # position in the market's outcome vector
+    label = Column(String, nullable=False)
+    
+    price = Column(Integer, nullable=False)
+    total_shares = Column(Integer, default=0)
+    
+    market = relationship("Market", back_populates="outcomes")
+    
+    __table_args__ = (
+        Index("ix_market_outcomes_market_id_index", "market_id", "index", unique=True),
+    )
 
 
 class Position(Base):
@@ -72,13 +182,16 @@ class Position(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
     outcome = Column(Enum(OutcomeType), nullable=False)
+    outcome_id = Column(Integer, ForeignKey("market_outcomes.id"), nullable=True)  # multi-outcome markets only (outcome is YES)
     
     shares = Column(Integer, default=0)  
     average_cost = Column(Integer, nullable=False)      
-    
+    version_id = Column(Integer, nullable=False, server_default="1")
     
     user = relationship("User", back_populates="positions")
     market = relationship("Market", back_populates="positions")
+    
+    __mapper_args__ = {"version_id_col": version_id}
 
 
 class Transaction(Base):
@@ -90,6 +203,7 @@ class Transaction(Base):
     
     transaction_type = Column(Enum(TransactionType), nullable=False)
     outcome = Column(Enum(OutcomeType), nullable=False)
+    outcome_id = Column(Integer, ForeignKey("market_outcomes.id"), nullable=True)  # multi-outcome markets only
     shares = Column(Integer, nullable=False)
     price_per_share = Column(Integer, nullable=False)  
     total_cost = Column(Integer, nullable=False)  
@@ -97,4 +211,110 @@ class Transaction(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="transactions")
-    market = relationship("Market", back_populates="transactions")
\ No newline at end of file
+    market = relationship("Market", back_populates="transactions")
+
+
+class ArchivedTransaction(Base):
+    """
+    Transactions of markets resolved long ago, moved out of the hot table
+    by the archival job (see app/archival.py). Rows keep their original id.
+    """
+    __tablename__ = "archived_transactions"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    market_id = Column(Integer, ForeignKey("markets.id"), nullable=False)
+    
+    transaction_type = Column(Enum(TransactionType), nullable=False)
+    outcome = Column(Enum(OutcomeType), nullable=False)
+    outcome_id = Column(Integer, ForeignKey("market_outcomes.id"), nullable=True)
+    shares = Column(Integer, nullable=False)
+    price_per_share = Column(Integer, nullable=False)
+    total_cost = Column(Integer, nullable=False)
+    
+    timestamp = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_archived_transactions_user_id_timestamp_id", "user_id", "timestamp", "id"),
+    )
+
+
+class TransactionSummary(Base):
+    """A user's archived trading in one market, rolled up."""
+    __tablename__ = "transaction_summaries"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    market_id = Column(Integer, ForeignKey("markets.id"), primary_key=True)
+    
+    trade_count = Column(Integer, nullable=False)
+    shares = Column(Integer, nullable=False)
+    total_cost = Column(Integer, nullable=False)  # cents
+    first_trade_at = Column(DateTime)
+    last_trade_at = Column(DateTime)
+
+
+class LedgerEntry(Base):
+    """
+    One leg of a double-entry journal. Every balance movement writes two
+    rows with the same journal_id whose amounts sum to zero: the user's
+    account and the counter account (a market's escrow or the platform).
+    Rows are never updated or deleted.
+    """
+    __tablename__ = "ledger_entries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    journal_id = Column(String, nullable=False, index=True)
+    account = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # set on user-account legs only
+    market_id = Column(Integer, nullable=True)  # no FK: entries outlive deleted markets
+    
+    entry_type = Column(Enum(LedgerEntryType), nullable=False)
+    amount = Column(Integer, nullable=False)  # cents, positive = credit to the account
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_ledger_entries_user_id_id", "user_id", "id"),
+    )
+
+
+class BalanceSnapshot(Base):
+    """
+    A user's ledger balance including every entry created up to taken_at.
+    last_entry_id is the newest entry it covers, for reference.
+    """
+    __tablename__ = "balance_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    balance = Column(Integer, nullable=False)
+    last_entry_id = Column(Integer, nullable=False)
+    taken_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_balance_snapshots_user_id_taken_at", "user_id", "taken_at"),
+    )
+
+
+class PortfolioSnapshot(Base):
+    """
+    A user's mark-to-market value at one point in time. Hourly rows are
+    taken on the hour, at most one per user, and folded into one row per
+    day once they age out.
+    """
+    __tablename__ = "portfolio_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    taken_at = Column(DateTime, nullable=False)
+    granularity = Column(Enum(SnapshotGranularity), nullable=False)
+    
+    balance = Column(Integer, nullable=False)
+    positions_value = Column(Integer, nullable=False)  # open positions at market prices
+    
+    __table_args__ = (
+        Index("ix_portfolio_snapshots_user_id_taken_at", "user_id", "taken_at"),
+        # Every worker runs the snapshot job; only the first to reach an hour writes it
+        Index("ix_portfolio_snapshots_user_id_granularity_taken_at", "user_id", "granularity", "taken_at", unique=True),
+    )
\ No newline at end of file
@@ -0,0 +1,114 @@
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, delete, func, case, cast, literal, Integer
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models import (
+    User, Market, MarketOutcome, Position, PortfolioSnapshot, MarketStatus, OutcomeType, SnapshotGranularity
+)
+
+
+HOURLY_RETENTION_DAYS = int(os.getenv("PORTFOLIO_HOURLY_RETENTION_DAYS", "7"))
+
+_snapshot_columns = PortfolioSnapshot.__table__.c
+
+
+def take_portfolio_snapshots(db: Session, now: datetime | None = None) -> int:
+    """
+    Record every user's balance and open-position value in a single
+    INSERT ... SELECT, stamped with the start of the current hour. Users
+    who already have that hour's snapshot (another worker got there
+    first) are skipped. Positions in resolved markets are excluded: their
+    payout is already in the balance.
+    """
+    hour = (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+
+    current_price = case(
+        (Position.outcome_id.is_not(None), MarketOutcome.price),
+        (Position.outcome == OutcomeType.YES, Market.yes_price),
+        else_=Market.no_price
+    )
+    position_values = select(
+        Position.user_id,
+        func.sum(Position.shares * current_price).label("value")
+    ).join(Market, Market.id == Position.market_id).outerjoin(
+        MarketOutcome, MarketOutcome.id == Position.outcome_id
+    ).where(
+        Position.shares > 0,
+        Market.status != MarketStatus.RESOLVED
+    ).group_by(Position.user_id).subquery()
+
+    already_taken = select(PortfolioSnapshot.id).where(
+        PortfolioSnapshot.user_id == User.id,
+        PortfolioSnapshot.granularity == SnapshotGranularity.HOUR,
+        PortfolioSnapshot.taken_at == hour
+    ).exists()
+
+    try:
+        result = db.execute(
+            insert(PortfolioSnapshot).from_select(
+                ["user_id", "taken_at", "granularity", "balance", "positions_value"],
+                select(
+                    User.id,
+                    literal(hour, _snapshot_columns.taken_at.type),
+                    literal(SnapshotGranularity.HOUR, _snapshot_columns.granularity.type),
+                    User.balance,
+                    func.coalesce(position_values.c.value, 0)
+                )
+                .outerjoin(position_values, position_values.c.user_id == User.id)
+                .where(~already_taken)
+            )
+        )
+        db.commit()
+    except IntegrityError:
+        # A worker racing us inserted this hour's rows first
+        db.rollback()
+        return 0
+
+    return result.rowcount
+
+
+def downsample_portfolio_snapshots(
+    db: Session,
+    now: datetime | None = None,
+    retention: timedelta = timedelta(days=HOURLY_RETENTION_DAYS)
+) -> int:
+    """
+    Fold hourly snapshots from whole days older than `retention` into one
+    daily row per user (the day's average), then delete the hourly rows.
+    Returns the number of daily rows written.
+    """
+    now = now or datetime.utcnow()
+    cutoff = (now - retention).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    is_old_hourly = (
+        (PortfolioSnapshot.granularity == SnapshotGranularity.HOUR)
+        & (PortfolioSnapshot.taken_at < cutoff)
+    )
+
+    result = db.execute(
+        insert(PortfolioSnapshot).from_select(
+            ["user_id", "taken_at", "granularity", "balance", "positions_value"],
+            select(
+                PortfolioSnapshot.user_id,
+                func.min(PortfolioSnapshot.taken_at),
+                literal(SnapshotGranularity.DAY, _snapshot_columns.granularity.type),
+                cast(func.avg(PortfolioSnapshot.balance), Integer),
+                cast(func.avg(PortfolioSnapshot.positions_value), Integer)
+            ).where(is_old_hourly).group_by(
+                PortfolioSnapshot.user_id,
+                func.date(PortfolioSnapshot.taken_at)
+            )
+        )
+    )
+    db.execute(delete(PortfolioSnapshot).where(is_old_hourly))
+    db.commit()
+
+    return result.rowcount
+
+
+def run_portfolio_snapshot_job(db: Session) -> None:
+    take_portfolio_snapshots(db)
+    downsample_portfolio_snapshots(db)
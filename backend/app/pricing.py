@@ -0,0 +1,96 @@
+def price_after_buy(yes_price: int, no_price: int, outcome: str, shares: int) -> tuple[int, int]:
+    """
+    Simple price adjustment (can be refined later).
+    For every 100 shares bought, increase the bought side's price by 1 cent
+    (at least 1, max 99); the other side is 100 minus it.
+
+    Returns (yes_price, no_price).
+    """
+    price_change = max(1, shares // 100)
+    
+    if outcome == "YES":
+        yes_price = min(99, yes_price + price_change)
+        return yes_price, 100 - yes_price
+    
+    no_price = min(99, no_price + price_change)
+    return 100 - no_price, no_price
+
+
+def average_cost_after_buy(shares: int, average_cost: int, bought: int, price: int) -> int:
+    """New average cost per share after buying `bought` more shares at `price`."""
+    return (shares * average_cost + bought * price) // (shares + bought)
+
+
+# Multi-outcome markets. Prices are a vector of integer cents summing to
+# 100; everything below works on the whole vector at once so a market with
+# 50 outcomes costs about the same as a binary one. numpy is imported on
+# first use to keep it off the worker's import path.
+
+def _numpy():
+    import numpy
+    return numpy
+
+
+def initial_outcome_prices(count: int) -> list[int]:
+    """An even split of 100 cents over `count` outcomes, leftover cents to the first ones."""
+    np = _numpy()
+    prices = np.full(count, 100 // count, dtype=np.int64)
+    prices[:100 % count] += 1
+    return prices.tolist()
+
+
+def max_outcome_price(count: int) -> int:
+    """Highest price one outcome can reach while every other keeps at least 1 cent."""
+    return 100 - (count - 1)
+
+
+def outcome_prices_after_buy(prices: list[int], index: int, shares: int) -> list[int]:
+    """
+    Multi-outcome price_after_buy. The bought outcome rises by 1 cent per
+    100 shares (at least 1, capped so every other outcome keeps at least
+    1 cent). The other outcomes give up those cents in proportion to their
+    price above 1 cent, so the vector still sums to 100. For two outcomes
+    this matches price_after_buy.
+    """
+    np = _numpy()
+    prices = np.asarray(prices, dtype=np.int64)
+    raised = min(max_outcome_price(len(prices)), int(prices[index]) + max(1, shares // 100))
+    moved = raised - int(prices[index])
+    if moved <= 0:
+        return prices.tolist()
+
+    headroom = prices - 1
+    headroom[index] = 0
+    exact = headroom * moved / headroom.sum()
+    cuts = np.floor(exact).astype(np.int64)
+
+    # Whole cents lost to flooring go to the largest remainders
+    leftover = moved - int(cuts.sum())
+    if leftover:
+        cuts[np.argsort(cuts - exact, kind="stable")[:leftover]] += 1
+
+    prices = prices - cuts
+    prices[index] = raised
+    return prices.tolist()
+
+
+def quote_outcomes(prices: list[int], shares: int) -> dict[str, list[int]]:
+    """
+    Buying `shares` of each outcome, side by side: what it costs now, the
+    outcome's price afterwards, and the profit if that outcome wins.
+    """
+    np = _numpy()
+    prices = np.asarray(prices, dtype=np.int64)
+    cost = prices * shares
+    return {
+        "cost": cost.tolist(),
+        "price_after": np.minimum(max_outcome_price(len(prices)), prices + max(1, shares // 100)).tolist(),
+        "profit_if_wins": (shares * 100 - cost).tolist(),
+    }
+
+
+def outcome_payouts(position_outcomes: list[int], position_shares: list[int], winner: int) -> list[int]:
+    """Payout in cents for each position when outcome id `winner` wins."""
+    np = _numpy()
+    shares = np.asarray(position_shares, dtype=np.int64)
+    return np.where(np.asarray(position_outcomes, dtype=np.int64) == winner, shares * 100, 0).tolist()
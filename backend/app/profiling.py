@@ -0,0 +1,195 @@
+"""
+Opt-in sampling profiler for request handlers.
+
+install() wraps every sync route endpoint once at startup. While the
+profiler is disabled the wrapper costs one attribute check. Once an admin
+enables it, for some routes or a random fraction of requests, a sampled
+request registers its handler thread. A background thread then grabs that
+thread's Python stack every `interval` seconds via sys._current_frames().
+SQL statements on sampled threads are timed with cursor-execute event
+listeners, which are only attached while profiling.
+
+Both are aggregated in collapsed-stack format ("frame;frame;frame count")
+for flamegraph.pl or speedscope: stacks count samples, SQL counts
+microseconds.
+"""
+import asyncio
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+DEFAULT_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+
+# Distinct stacks kept per session; further new stacks are counted as truncated
+MAX_STACKS = int(os.getenv("PROFILER_MAX_STACKS", "10000"))
+
+TRUNCATED = "[truncated]"
+
+
+def frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def statement_name(statement: str) -> str:
+    """One line of SQL, safe to use as a collapsed-stack frame."""
+    return "SQL " + " ".join(statement.split()).replace(";", ",")[:120]
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.routes: set[str] = set()
+        self.sample_rate = 0.0
+        self.interval = DEFAULT_INTERVAL_MS / 1000
+
+        self._lock = threading.Lock()
+        self._active: dict[int, str] = {}  # thread id -> route being sampled
+        self._sql_started: dict[int, list[float]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._installed: set[str] = set()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stacks: Counter = Counter()
+            self.sql: Counter = Counter()
+            self.requests: Counter = Counter()
+            self.samples = 0
+            self.started_at: float | None = None
+
+    def install(self, app: FastAPI) -> None:
+        """Wrap each sync endpoint of `app` so it can be sampled. Safe to call again."""
+        for route in app.routes:
+            if not isinstance(route, APIRoute) or route.unique_id in self._installed:
+                continue
+            call = route.dependant.call
+            if call is None or asyncio.iscoroutinefunction(call):
+                continue
+            route.dependant.call = self._wrap(route.path, call)
+            self._installed.add(route.unique_id)
+
+    def _wrap(self, path: str, call: Callable) -> Callable:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            if not self.enabled:
+                return call(*args, **kwargs)
+            return self.run(path, call, args, kwargs)
+
+        return endpoint
+
+    def run(self, path: str, call: Callable, args: tuple, kwargs: dict):
+        if path not in self.routes and random.random() >= self.sample_rate:
+            return call(*args, **kwargs)
+
+        ident = threading.get_ident()
+        self._active[ident] = path
+        with self._lock:
+            self.requests[path] += 1
+        try:
+            return call(*args, **kwargs)
+        finally:
+            self._active.pop(ident, None)
+            self._sql_started.pop(ident, None)
+
+    def enable(self, routes: list[str], sample_rate: float, interval: float | None = None) -> None:
+        """Start a fresh profiling session."""
+        self.disable()
+        self.reset()
+        self.routes = set(routes)
+        self.sample_rate = sample_rate
+        self.interval = interval or DEFAULT_INTERVAL_MS / 1000
+        self.started_at = time.time()
+
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop sampling; the collected data stays readable until the next enable()."""
+        self.enabled = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if event.contains(Engine, "before_cursor_execute", self._before_cursor_execute):
+            event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _sample_loop(self):
+        stop_at = self.run.__code__
+        while not self._stop.wait(self.interval):
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            for ident, path in list(self._active.items()):
+                frame = frames.get(ident)
+                names = []
+                # Leaf first, up to the profiler's own wrapper
+                while frame is not None and frame.f_code is not stop_at:
+                    names.append(frame_name(frame.f_code))
+                    frame = frame.f_back
+                if names:
+                    names.append(path)
+                    self._add(self.stacks, ";".join(reversed(names)), 1)
+            with self._lock:
+                self.samples += 1
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        ident = threading.get_ident()
+        if ident in self._active:
+            self._sql_started.setdefault(ident, []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        ident = threading.get_ident()
+        started = self._sql_started.get(ident)
+        if not started:
+            return
+        elapsed_us = int((time.perf_counter() - started.pop()) * 1_000_000)
+        path = self._active.get(ident)
+        if path is not None:
+            self._add(self.sql, f"{path};{statement_name(statement)}", elapsed_us)
+
+    def _add(self, counter: Counter, stack: str, value: int) -> None:
+        with self._lock:
+            if stack not in counter and len(counter) >= MAX_STACKS:
+                stack = TRUNCATED
+            counter[stack] += value
+
+    def collapsed(self, kind: str = "stacks") -> str:
+        counter = self.sql if kind == "sql" else self.stacks
+        with self._lock:
+            lines = [f"{stack} {value}" for stack, value in sorted(counter.items())]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "routes": sorted(self.routes),
+                "sample_rate": self.sample_rate,
+                "interval_ms": self.interval * 1000,
+                "started_at": self.started_at,
+                "samples": self.samples,
+                "sampled_requests": dict(self.requests),
+                "distinct_stacks": len(self.stacks),
+                "distinct_statements": len(self.sql),
+            }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,227 @@
+"""
+Compact quotes for every market, for bots and the home page.
+
+The board is a packed array with one fixed-size record per market id:
+(id uint32, yes_price uint8, no_price uint8, status uint8), little endian.
+Slots with no market have status EMPTY. Writers update records in place
+and bump a version. A bounded change log lets clients fetch only the
+markets that changed `since` a version they already hold.
+
+Each worker process keeps its own board and only sees the writes it
+served itself; writes from other workers (and from admin.py) reach it when
+the next reload diffs the markets table. Deltas from one worker are
+therefore up to one reload interval behind, which is why the reload runs
+every couple of seconds and is cheap when nothing changed.
+
+Versions restart from zero with every process, so each board also has a
+random epoch. A client holding a version from another epoch (or one
+ahead of the board) gets a full snapshot; clients should drop their
+copy whenever the epoch changes.
+
+Binary responses are a header (epoch uint32, version uint64, full uint8,
+count uint32) followed by `count` records. Status codes: 0 open,
+1 closed, 2 resolved, 3 deleted (deltas only), 255 empty slot (full
+binary snapshots only, which are the whole array copied as-is). JSON
+responses carry the same data as
+{"epoch", "version", "full", "quotes": [[id, yes_price, no_price, status], ...]}
+with status names.
+"""
+import bisect
+import os
+import struct
+import threading
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .cache import CachedPayload
+from .models import Market, MarketStatus
+
+
+RECORD = struct.Struct("<IBBB")
+HEADER = struct.Struct("<IQBI")
+STATUS_OFFSET = 6  # byte offset of status within a record
+
+STATUS_CODES = {MarketStatus.OPEN: 0, MarketStatus.CLOSED: 1, MarketStatus.RESOLVED: 2}
+DELETED = 3  # only ever sent in deltas
+EMPTY = 255
+STATUS_NAMES = {code: status.value for status, code in STATUS_CODES.items()} | {DELETED: "deleted"}
+
+# Changes kept for `since` deltas; older clients get a full snapshot
+CHANGE_LOG_SIZE = int(os.getenv("QUOTE_CHANGE_LOG_SIZE", "10000"))
+
+
+class QuoteBoard:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = bytearray()
+        # Each market's quote pre-encoded as a JSON array, None for empty slots,
+        # so a JSON snapshot is a single join
+        self._fragments: list[bytes | None] = []
+        self.epoch = int.from_bytes(os.urandom(4), "little")
+        self.version = 0
+        self.loaded = False
+
+        # Parallel lists: the version each change was made at, and the market it touched
+        self._log_versions: list[int] = []
+        self._log_ids: list[int] = []
+        self._log_floor = 0  # deltas from before this version can't be served
+
+        self._snapshots: dict[str, tuple[int, CachedPayload]] = {}
+
+    def load(self, db: Session) -> int:
+        """
+        (Re)seed from the markets table, logging whatever differs from the
+        board. Markets written while the query ran keep their board record,
+        which may be newer than the row the query read.
+        """
+        with self._lock:
+            started = self.version
+
+        records = bytearray()
+        for market_id, yes_price, no_price, status in db.execute(
+            select(Market.id, Market.yes_price, Market.no_price, Market.status)
+        ):
+            _grow(records, market_id)
+            RECORD.pack_into(records, market_id * RECORD.size, market_id, yes_price, no_price, STATUS_CODES[status])
+
+        with self._lock:
+            size = max(len(records), len(self._records))
+            _grow(records, size // RECORD.size - 1)
+            _grow(self._records, size // RECORD.size - 1)
+
+            if self._log_floor > started:
+                # Writes made during the query fell out of the log; keep the
+                # whole board and let the next load reconcile it
+                touched = range(len(self._records) // RECORD.size)
+            else:
+                touched = set(self._log_ids[bisect.bisect_right(self._log_versions, started):])
+            for market_id in touched:
+                offset = market_id * RECORD.size
+                records[offset:offset + RECORD.size] = self._records[offset:offset + RECORD.size]
+
+            changed = [
+                offset // RECORD.size for offset in range(0, size, RECORD.size)
+                if records[offset:offset + RECORD.size] != self._records[offset:offset + RECORD.size]
+            ]
+            if not self.loaded:
+                self.version += 1
+                self._log_floor = self.version
+            elif changed:
+                # A reload that finds nothing new keeps the version, so
+                # frequent reloads don't invalidate clients or cached snapshots
+                self.version += 1
+                for market_id in changed:
+                    self._log(market_id)
+            if not self.loaded or changed or size != len(self._fragments) * RECORD.size:
+                self._fragments = [_fragment(*quote) for quote in RECORD.iter_unpack(records)]
+            self._records = records
+            self.loaded = True
+
+        return len(records) // RECORD.size
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self.loaded:
+            self.load(db)
+
+    def update(self, market_id: int, yes_price: int, no_price: int, status: MarketStatus) -> None:
+        # Applied even before the first load, which keeps it if it lands mid-query
+        with self._lock:
+            self._set(market_id, yes_price, no_price, STATUS_CODES[status])
+
+    def update_status(self, market_id: int, status: MarketStatus) -> None:
+        with self._lock:
+            offset = market_id * RECORD.size
+            if offset >= len(self._records) or self._records[offset + STATUS_OFFSET] == EMPTY:
+                return
+            _, yes_price, no_price, _ = RECORD.unpack_from(self._records, offset)
+            self._set(market_id, yes_price, no_price, STATUS_CODES[status])
+
+    def _set(self, market_id: int, yes_price: int, no_price: int, status: int) -> None:
+        _grow(self._records, market_id)
+        self._fragments.extend([None] * (market_id + 1 - len(self._fragments)))
+
+        RECORD.pack_into(self._records, market_id * RECORD.size, market_id, yes_price, no_price, status)
+        self._fragments[market_id] = _fragment(market_id, yes_price, no_price, status)
+        self.version += 1
+        self._log(market_id)
+
+    def _log(self, market_id: int) -> None:
+        self._log_versions.append(self.version)
+        self._log_ids.append(market_id)
+        if len(self._log_ids) > CHANGE_LOG_SIZE:
+            drop = len(self._log_ids) - CHANGE_LOG_SIZE
+            # Everything at the oldest kept version is still complete, so
+            # deltas are served from just before it
+            self._log_floor = self._log_versions[drop] - 1
+            del self._log_versions[:drop]
+            del self._log_ids[:drop]
+
+    def snapshot(self, since: int | None = None, binary: bool = False, epoch: int | None = None) -> CachedPayload:
+        """
+        The full board, or only markets changed after version `since` when
+        the log covers it. A `since` from another epoch, or ahead of the
+        board (from before a restart), gets the full board.
+        """
+        with self._lock:
+            if (
+                since is not None
+                and self._log_floor <= since <= self.version
+                and epoch in (None, self.epoch)
+            ):
+                start = bisect.bisect_right(self._log_versions, since)
+                market_ids = sorted(set(self._log_ids[start:]))
+                if binary:
+                    records = [
+                        RECORD.pack(market_id, 0, 0, DELETED) if self._records[offset + STATUS_OFFSET] == EMPTY
+                        else self._records[offset:offset + RECORD.size]
+                        for market_id, offset in ((market_id, market_id * RECORD.size) for market_id in market_ids)
+                    ]
+                    return CachedPayload(_binary(self.epoch, self.version, False, records), "application/octet-stream")
+                fragments = [
+                    self._fragments[market_id] or _fragment(market_id, 0, 0, DELETED)
+                    for market_id in market_ids
+                ]
+                return CachedPayload(_json(self.epoch, self.version, False, fragments))
+
+            kind = "binary" if binary else "json"
+            cached = self._snapshots.get(kind)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+
+            if binary:
+                # The board is already in wire format
+                payload = CachedPayload(_binary(self.epoch, self.version, True, [self._records]), "application/octet-stream")
+            else:
+                payload = CachedPayload(_json(
+                    self.epoch, self.version, True, [fragment for fragment in self._fragments if fragment is not None]
+                ))
+            self._snapshots[kind] = (self.version, payload)
+            return payload
+
+
+def _grow(records: bytearray, market_id: int) -> None:
+    """Extend `records` with EMPTY slots up to and including `market_id`."""
+    for slot in range(len(records) // RECORD.size, market_id + 1):
+        records += RECORD.pack(slot, 0, 0, EMPTY)
+
+
+def _fragment(market_id: int, yes_price: int, no_price: int, status: int) -> bytes | None:
+    if status == EMPTY:
+        return None
+    return orjson.dumps((market_id, yes_price, no_price, STATUS_NAMES[status]))
+
+
+def _binary(epoch: int, version: int, full: bool, records: list) -> bytes:
+    body = b"".join(records)
+    return HEADER.pack(epoch, version, full, len(body) // RECORD.size) + body
+
+
+def _json(epoch: int, version: int, full: bool, fragments: list[bytes]) -> bytes:
+    return b'{"epoch":%d,"version":%d,"full":%s,"quotes":[%s]}' % (
+        epoch, version, b"true" if full else b"false", b",".join(fragments)
+    )
+
+
+quote_board = QuoteBoard()
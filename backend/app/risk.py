@@ -0,0 +1,289 @@
+import threading
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from .models import Market, MarketOutcome, MarketStats, Position, MarketStatus, MarketType, OutcomeType
+
+
+# Per-market slots in RiskBook._markets
+YES_SHARES, NO_SHARES, YES_HOLDERS, NO_HOLDERS, PREMIUMS = range(5)
+
+# Per-market slots in RiskBook._multi; OUTCOMES maps label -> [shares, holders]
+OUTCOMES, MULTI_PREMIUMS = range(2)
+
+
+class RiskBook:
+    """
+    Outstanding liabilities of every unresolved market, kept in memory.
+
+    Each winning share pays 100 cents, so a market's YES liability is its
+    outstanding YES shares x 100 (same for NO). Multi-outcome markets keep
+    one liability per outcome instead, and only one of them can win.
+    Premiums are what buyers paid into the market's escrow. Net exposure
+    for an outcome is what the platform pays out beyond the premiums it
+    collected if that outcome wins. Fills and resolutions update the book
+    incrementally; load() seeds it from grouped queries over positions.
+
+    Fills and resolutions that land while load() runs are buffered and
+    replayed onto the loaded book unless the query already saw them. A
+    fill was seen if the market's version_id in the query is at least the
+    version the fill committed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._markets: dict[int, list[int]] = {}
+        self._multi: dict[int, list] = {}
+        self.loaded = False
+
+        # Set while a load runs: (market_id, version, outcome, shares, cost, new_holder, multi)
+        self._pending_fills: list[tuple] | None = None
+        self._pending_drops: set[int] = set()
+
+    def load(self, db: Session) -> int:
+        with self._load_lock:
+            with self._lock:
+                self._pending_fills = []
+                self._pending_drops = set()
+            try:
+                markets, multi, versions = _query_books(db)
+            except Exception:
+                with self._lock:
+                    self._pending_fills = None
+                raise
+
+            with self._lock:
+                for market_id, version, *fill in self._pending_fills:
+                    if version > versions.get(market_id, 0):
+                        _apply_fill(markets, multi, market_id, *fill)
+                for market_id in self._pending_drops:
+                    markets.pop(market_id, None)
+                    multi.pop(market_id, None)
+                self._markets = markets
+                self._multi = multi
+                self._pending_fills = None
+                self.loaded = True
+
+        return len(markets) + len(multi)
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self.loaded:
+            self.load(db)
+
+    def record_fill(
+        self, market_id: int, version: int, outcome: str, shares: int, cost: int, new_holder: bool,
+        multi: bool = False
+    ) -> None:
+        """
+        Add a committed fill; `version` is the market's version_id as of
+        that commit. For multi-outcome markets `outcome` is the label.
+        """
+        with self._lock:
+            if self._pending_fills is not None:
+                self._pending_fills.append((market_id, version, outcome, shares, cost, new_holder, multi))
+            if self.loaded:
+                _apply_fill(self._markets, self._multi, market_id, outcome, shares, cost, new_holder, multi)
+
+    def drop(self, market_id: int) -> None:
+        """A resolved market has paid out and carries no more risk."""
+        with self._lock:
+            if self._pending_fills is not None:
+                self._pending_drops.add(market_id)
+            self._markets.pop(market_id, None)
+            self._multi.pop(market_id, None)
+
+    def exposure(self, market_id: int) -> dict:
+        if market_id in self._multi:
+            return _describe_multi(market_id, self._multi[market_id])
+        return _describe(market_id, self._markets.get(market_id, [0, 0, 0, 0, 0]))
+
+    def preview(self, market_id: int, outcome: str) -> dict:
+        """What resolving `market_id` to `outcome` would pay, in O(1)."""
+        if market_id in self._multi:
+            return _preview_multi(market_id, self._multi[market_id], outcome)
+        return _preview(market_id, self._markets.get(market_id, [0, 0, 0, 0, 0]), outcome)
+
+    def summary(self, top: int = 20) -> dict:
+        with self._lock:
+            markets = [_describe(market_id, book) for market_id, book in self._markets.items()]
+            multi = [_describe_multi(market_id, book) for market_id, book in self._multi.items()]
+
+        ranked = sorted(markets + multi, key=lambda market: market["worst_case_exposure"], reverse=True)
+
+        return {
+            "markets": len(ranked),
+            "yes_liability": sum(market["yes_liability"] for market in markets),
+            "no_liability": sum(market["no_liability"] for market in markets),
+            "multi_liability": sum(market["worst_liability"] for market in multi),
+            "premiums_collected": sum(market["premiums_collected"] for market in ranked),
+            "worst_case_exposure": sum(market["worst_case_exposure"] for market in ranked),
+            "top_markets": ranked[:top],
+        }
+
+
+def _describe(market_id: int, book: list[int]) -> dict:
+    yes_liability = book[YES_SHARES] * 100
+    no_liability = book[NO_SHARES] * 100
+    premiums = book[PREMIUMS]
+
+    return {
+        "market_id": market_id,
+        "market_type": MarketType.BINARY.value,
+        "yes_liability": yes_liability,
+        "no_liability": no_liability,
+        "premiums_collected": premiums,
+        "net_if_yes": yes_liability - premiums,
+        "net_if_no": no_liability - premiums,
+        "worst_case_exposure": max(yes_liability, no_liability) - premiums,
+    }
+
+
+def _describe_multi(market_id: int, book: list) -> dict:
+    liabilities = {label: shares * 100 for label, (shares, _) in book[OUTCOMES].items()}
+    worst = max(liabilities, key=liabilities.get, default=None)
+    worst_liability = liabilities.get(worst, 0)
+    premiums = book[MULTI_PREMIUMS]
+
+    return {
+        "market_id": market_id,
+        "market_type": MarketType.MULTI.value,
+        "outcome_liabilities": liabilities,
+        "premiums_collected": premiums,
+        "worst_outcome": worst,
+        "worst_liability": worst_liability,
+        "worst_case_exposure": worst_liability - premiums,
+    }
+
+
+def _query_books(
+    db: Session, market_id: int | None = None
+) -> tuple[dict[int, list[int]], dict[int, list], dict[int, int]]:
+    """
+    Books of unresolved binary and multi-outcome markets (or just
+    `market_id`), and each market's version_id.
+    """
+    binary = (
+        select(
+            Position.market_id,
+            Position.outcome,
+            func.sum(Position.shares),
+            func.count(Position.id),
+            MarketStats.traded_notional,
+            Market.version_id
+        )
+        .join(Market, Market.id == Position.market_id)
+        .outerjoin(MarketStats, MarketStats.market_id == Position.market_id)
+        .where(
+            Position.shares > 0,
+            Position.outcome_id.is_(None),
+            Market.status != MarketStatus.RESOLVED
+        )
+        .group_by(Position.market_id, Position.outcome, MarketStats.traded_notional, Market.version_id)
+    )
+    multi = (
+        select(
+            Position.market_id,
+            MarketOutcome.label,
+            func.sum(Position.shares),
+            func.count(Position.id),
+            MarketStats.traded_notional,
+            Market.version_id
+        )
+        .join(MarketOutcome, MarketOutcome.id == Position.outcome_id)
+        .join(Market, Market.id == Position.market_id)
+        .outerjoin(MarketStats, MarketStats.market_id == Position.market_id)
+        .where(
+            Position.shares > 0,
+            Market.status != MarketStatus.RESOLVED
+        )
+        .group_by(Position.market_id, MarketOutcome.label, MarketStats.traded_notional, Market.version_id)
+    )
+    if market_id is not None:
+        binary = binary.where(Position.market_id == market_id)
+        multi = multi.where(Position.market_id == market_id)
+
+    markets: dict[int, list[int]] = {}
+    versions: dict[int, int] = {}
+    for market_id, outcome, shares, holders, premiums, version in db.execute(binary):
+        book = markets.setdefault(market_id, [0, 0, 0, 0, premiums or 0])
+        versions[market_id] = version
+        if outcome == OutcomeType.YES:
+            book[YES_SHARES], book[YES_HOLDERS] = shares, holders
+        else:
+            book[NO_SHARES], book[NO_HOLDERS] = shares, holders
+
+    multi_markets: dict[int, list] = {}
+    for market_id, label, shares, holders, premiums, version in db.execute(multi):
+        book = multi_markets.setdefault(market_id, [{}, premiums or 0])
+        versions[market_id] = version
+        book[OUTCOMES][label] = [shares, holders]
+
+    return markets, multi_markets, versions
+
+
+def _apply_fill(
+    markets: dict[int, list[int]], multi_markets: dict[int, list], market_id: int,
+    outcome: str, shares: int, cost: int, new_holder: bool, multi: bool = False
+) -> None:
+    if multi:
+        book = multi_markets.setdefault(market_id, [{}, 0])
+        slot = book[OUTCOMES].setdefault(outcome, [0, 0])
+        slot[0] += shares
+        slot[1] += new_holder
+        book[MULTI_PREMIUMS] += cost
+        return
+
+    book = markets.setdefault(market_id, [0, 0, 0, 0, 0])
+    if outcome == "YES":
+        book[YES_SHARES] += shares
+        book[YES_HOLDERS] += new_holder
+    else:
+        book[NO_SHARES] += shares
+        book[NO_HOLDERS] += new_holder
+    book[PREMIUMS] += cost
+
+
+def _preview(market_id: int, book: list[int], outcome: str) -> dict:
+    if outcome == "YES":
+        payout, winners = book[YES_SHARES] * 100, book[YES_HOLDERS]
+    else:
+        payout, winners = book[NO_SHARES] * 100, book[NO_HOLDERS]
+
+    return _preview_payload(market_id, outcome, payout, winners, book[PREMIUMS])
+
+
+def _preview_multi(market_id: int, book: list, outcome: str) -> dict:
+    shares, winners = book[OUTCOMES].get(outcome, (0, 0))
+    return _preview_payload(market_id, outcome, shares * 100, winners, book[MULTI_PREMIUMS])
+
+
+def _preview_payload(market_id: int, outcome: str, payout: int, winners: int, premiums: int) -> dict:
+    return {
+        "market_id": market_id,
+        "outcome": outcome,
+        "payout": payout,
+        "winning_positions": winners,
+        "premiums_collected": premiums,
+        "net_exposure": payout - premiums,
+    }
+
+
+def preview_resolution(db: Session, market: Market) -> dict[str, dict]:
+    """
+    What resolving one market to each of its outcomes would pay, from
+    grouped queries over that market's positions only. For one-off
+    callers (admin.py) that have no loaded RiskBook.
+    """
+    markets, multi, _ = _query_books(db, market.id)
+
+    if market.market_type == MarketType.MULTI:
+        book = multi.get(market.id, [{}, 0])
+        return {o.label: _preview_multi(market.id, book, o.label) for o in market.outcomes}
+
+    book = markets.get(market.id, [0, 0, 0, 0, 0])
+    return {outcome: _preview(market.id, book, outcome) for outcome in ("YES", "NO")}
+
+
+risk_book = RiskBook()
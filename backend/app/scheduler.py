@@ -0,0 +1,183 @@
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Market, MarketStatus
+from .settlement import settle_market
+from .concurrency import run_with_retry
+
+
+logger = logging.getLogger(__name__)
+
+CLOSE = "close"
+RESOLVE = "resolve"
+
+
+class MarketScheduler:
+    """
+    Closes and resolves markets at their close_at / resolve_at deadlines.
+
+    Upcoming deadlines are kept in a min-heap; a single thread sleeps until
+    the earliest one, then handles everything that is due at once: due
+    markets are closed with one UPDATE, and markets with a pending outcome
+    are resolved together in one transaction. Reaching resolve_at without a
+    pending outcome only closes the market, leaving it for an admin.
+
+    The ids of markets this process has seen closed are kept in memory so
+    execute_trade can reject them without a query.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, str, int]] = []
+        self._closed: set[int] = set()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._load_on_start = False
+        self.listeners: list[Callable[[list[int], list[int]], None]] = []
+
+    def is_closed(self, market_id: int) -> bool:
+        return market_id in self._closed
+
+    def load(self, db: Session) -> int:
+        """Seed the heap with the deadlines of every unresolved market."""
+        rows = db.execute(
+            select(Market.id, Market.status, Market.close_at, Market.resolve_at).where(
+                Market.status != MarketStatus.RESOLVED,
+                or_(Market.close_at.is_not(None), Market.resolve_at.is_not(None))
+            )
+        ).all()
+
+        with self._wakeup:
+            self._heap = []
+            for market_id, status, close_at, resolve_at in rows:
+                if status == MarketStatus.CLOSED:
+                    self._closed.add(market_id)
+                if close_at is not None:
+                    self._heap.append((close_at, CLOSE, market_id))
+                if resolve_at is not None:
+                    self._heap.append((resolve_at, RESOLVE, market_id))
+            heapq.heapify(self._heap)
+            self._wakeup.notify()
+
+        return len(self._heap)
+
+    def schedule(self, market: Market) -> None:
+        with self._wakeup:
+            if market.close_at is not None:
+                heapq.heappush(self._heap, (market.close_at, CLOSE, market.id))
+            if market.resolve_at is not None:
+                heapq.heappush(self._heap, (market.resolve_at, RESOLVE, market.id))
+            self._wakeup.notify()
+
+    def start(self, load: bool = False):
+        """Start the scheduler thread; with `load`, it seeds itself from the database first."""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._load_on_start = load
+        self._thread = threading.Thread(target=self._run, name="market-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        if self._load_on_start:
+            db = SessionLocal()
+            try:
+                self.load(db)
+            except Exception:
+                logger.exception("Failed to load market deadlines")
+            finally:
+                db.close()
+
+        while True:
+            with self._wakeup:
+                while not self._stopping:
+                    now = datetime.utcnow()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+                    self._wakeup.wait(timeout)
+
+                if self._stopping:
+                    return
+
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+
+            db = SessionLocal()
+            try:
+                run_with_retry(db, "scheduler", lambda: self.run_due(db, due, now))
+            except Exception:
+                db.rollback()
+                logger.exception("Failed to process %d market deadline(s)", len(due))
+            finally:
+                db.close()
+
+    def run_due(self, db: Session, due: list[tuple[datetime, str, int]], now: datetime) -> tuple[list[int], list[int]]:
+        """Close and resolve the markets behind `due` heap entries. Returns (closed_ids, resolved_ids)."""
+        market_ids = {market_id for _, _, market_id in due}
+        resolve_ids = {market_id for _, kind, market_id in due if kind == RESOLVE}
+
+        # Deadlines are re-checked against the row in case they moved since
+        # the entry was pushed
+        past_deadline = or_(
+            and_(Market.close_at.is_not(None), Market.close_at <= now),
+            and_(Market.resolve_at.is_not(None), Market.resolve_at <= now)
+        )
+        closed_ids = db.scalars(
+            select(Market.id).where(
+                Market.id.in_(market_ids),
+                Market.status == MarketStatus.OPEN,
+                past_deadline
+            )
+        ).all()
+
+        if closed_ids:
+            db.execute(
+                update(Market)
+                .where(Market.id.in_(closed_ids))
+                .values(status=MarketStatus.CLOSED, version_id=Market.version_id + 1)
+                .execution_options(synchronize_session=False)
+            )
+
+        resolved_ids = []
+        if resolve_ids:
+            markets = db.query(Market).filter(
+                Market.id.in_(resolve_ids),
+                Market.status != MarketStatus.RESOLVED,
+                Market.pending_outcome.is_not(None),
+                Market.resolve_at <= now
+            ).all()
+            for market in markets:
+                settle_market(db, market, market.pending_outcome)
+                market.pending_outcome = None
+                resolved_ids.append(market.id)
+
+        db.commit()
+
+        self._closed.update(closed_ids)
+        self._closed.update(resolved_ids)
+
+        if closed_ids or resolved_ids:
+            for listener in self.listeners:
+                listener(list(closed_ids), resolved_ids)
+
+        return list(closed_ids), resolved_ids
+
+
+market_scheduler = MarketScheduler()
@@ -1,9 +1,31 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Literal
 
 AllowedCategory = Literal["uc", "ivy", "csu", "international", "other"]
 
+
+def to_naive_utc(v: Optional[datetime]) -> Optional[datetime]:
+    """Deadlines are stored as naive UTC like every other timestamp."""
+    if v is not None and v.tzinfo is not None:
+        return v.astimezone(timezone.utc).replace(tzinfo=None)
+    return v
+
+
+def future_deadline(v: Optional[datetime]) -> Optional[datetime]:
+    """A new market's deadline, as naive UTC; it must not have passed already."""
+    v = to_naive_utc(v)
+    if v is not None and v <= datetime.utcnow():
+        raise ValueError('Deadline must be in the future')
+    return v
+
+
+def resolve_not_before_close(resolve_at: Optional[datetime], close_at: Optional[datetime]) -> Optional[datetime]:
+    if resolve_at is not None and close_at is not None and resolve_at < close_at:
+        raise ValueError('resolve_at must not be before close_at')
+    return resolve_at
+
+
 class UserCreate(BaseModel):
     username: str = Field(..., min_length=3, max_length=20)
     email: EmailStr
@@ -46,6 +68,8 @@ class MarketCreate(MarketBase):
     yes_price: int = Field(..., ge=1, le=99) 
     no_price: int = Field(..., ge=1, le=99)
     category: AllowedCategory = "other"
+    close_at: Optional[datetime] = None
+    resolve_at: Optional[datetime] = None
 
     @field_validator('no_price')
     def prices_sum_to_100(cls, v, info):
@@ -53,6 +77,61 @@ class MarketCreate(MarketBase):
         if yes_price and yes_price + v != 100:
             raise ValueError('yes_price and no_price must sum to 100')
         return v
+    
+    @field_validator('close_at', 'resolve_at')
+    def deadlines_in_future(cls, v):
+        return future_deadline(v)
+
+    @field_validator('resolve_at')
+    def resolve_after_close(cls, v, info):
+        return resolve_not_before_close(v, info.data.get('close_at'))
+
+
+class MultiMarketCreate(MarketBase):
+    outcomes: list[str] = Field(..., min_length=2, max_length=50)
+    prices: Optional[list[int]] = None  # cents per outcome; an even split if omitted
+    category: AllowedCategory = "other"
+    close_at: Optional[datetime] = None
+    resolve_at: Optional[datetime] = None
+
+    @field_validator('outcomes')
+    def outcomes_are_distinct(cls, v):
+        v = [label.strip() for label in v]
+        if any(not label or len(label) > 100 for label in v):
+            raise ValueError('Outcome labels must be 1-100 characters')
+        if len(set(v)) != len(v):
+            raise ValueError('Outcome labels must be unique')
+        return v
+
+    @field_validator('prices')
+    def prices_match_outcomes(cls, v, info):
+        outcomes = info.data.get('outcomes')
+        if v is None:
+            return v
+        if outcomes and len(v) != len(outcomes):
+            raise ValueError('Need one price per outcome')
+        if any(price < 1 or price > 99 for price in v) or sum(v) != 100:
+            raise ValueError('Prices must be between 1 and 99 and sum to 100')
+        return v
+
+    @field_validator('close_at', 'resolve_at')
+    def deadlines_in_future(cls, v):
+        return future_deadline(v)
+
+    @field_validator('resolve_at')
+    def resolve_after_close(cls, v, info):
+        return resolve_not_before_close(v, info.data.get('close_at'))
+
+
+class MarketStatsResponse(BaseModel):
+    trade_count: int
+    traded_notional: int
+    unique_traders: int
+    open_interest: int
+    volume_24h: int
+    price_change_24h: int
+    
+    model_config = {"from_attributes": True}
 
 
 class MarketResponse(MarketBase):
@@ -66,10 +145,37 @@ class MarketResponse(MarketBase):
     resolution_date: Optional[datetime] = None
     category: str
     created_at: datetime
+    close_at: Optional[datetime] = None
+    resolve_at: Optional[datetime] = None
+    stats: Optional[MarketStatsResponse] = None
+    market_type: str = "binary"
     
     model_config = {"from_attributes": True}
 
 
+class MarketOutcomeResponse(BaseModel):
+    id: int
+    index: int
+    label: str
+    price: int
+    total_shares: int
+    
+    model_config = {"from_attributes": True}
+
+
+class MultiMarketResponse(MarketResponse):
+    outcomes: list[MarketOutcomeResponse]
+
+
+class OutcomeQuote(BaseModel):
+    index: int
+    label: str
+    price: int
+    cost: int
+    price_after: int
+    profit_if_wins: int
+
+
 class PositionResponse(BaseModel):
     id: int
     market_id: int
@@ -117,6 +223,11 @@ class TradeRequest(BaseModel):
             raise ValueError('Outcome must be YES or NO')
         return v
 
+class MultiTradeRequest(BaseModel):
+    market_id: int
+    outcome_index: int = Field(..., ge=0)
+    shares: int = Field(..., gt=0, le=10000)
+
 class TradeResponse(BaseModel):
     success: bool
     message: str
@@ -141,11 +252,50 @@ class PortfolioSummary(BaseModel):
 
 
 
+class TransactionSummaryResponse(BaseModel):
+    """A user's archived trading in one market, rolled up."""
+    market_id: int
+    market_college_name: str
+    trade_count: int
+    shares: int
+    total_cost: int
+    first_trade_at: Optional[datetime]
+    last_trade_at: Optional[datetime]
+
+
+class PortfolioHistoryPoint(BaseModel):
+    timestamp: datetime
+    balance: int
+    positions_value: int
+    total_value: int
+
+
+
 class MarketResolve(BaseModel):
     outcome: str  
+    resolve_at: Optional[datetime] = None  # resolve later instead of now
     
     @field_validator('outcome')
     def outcome_must_be_valid(cls, v):
         if v not in ['YES', 'NO']:
             raise ValueError('Outcome must be YES or NO')
-        return v
\ No newline at end of file
+        return v
+    
+    @field_validator('resolve_at')
+    def resolve_at_in_utc(cls, v):
+        return to_naive_utc(v)
+
+
+class MultiMarketResolve(BaseModel):
+    outcome: str = Field(..., min_length=1)  # the winning outcome's label
+    resolve_at: Optional[datetime] = None
+    
+    @field_validator('resolve_at')
+    def resolve_at_in_utc(cls, v):
+        return to_naive_utc(v)
+
+
+class ProfilerConfig(BaseModel):
+    routes: list[str] = []  # route paths to sample on every request, e.g. "/trade"
+    sample_rate: float = Field(default=0.0, ge=0, le=1)  # fraction of all other requests
+    interval_ms: float = Field(default=5, gt=0, le=1000)
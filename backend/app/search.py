@@ -0,0 +1,382 @@
+import bisect
+import heapq
+import os
+import re
+import threading
+from collections import defaultdict
+
+from sqlalchemy.orm import Session
+
+from .models import Market
+
+
+NAME_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+EXACT_BONUS = 0.5
+FUZZY_PENALTY = 0.6
+MIN_SIMILARITY = 0.25
+
+# Best-ranked ids kept on every trie node, enough for a page of results
+NODE_TOP_K = int(os.getenv("SEARCH_NODE_TOP_K", "100"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def trigrams(word: str) -> set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _node_score(weight: float, exact_weight: float | None) -> float:
+    """Score of a market for a query term ending at a trie node."""
+    return weight if exact_weight is None else max(weight, exact_weight + EXACT_BONUS)
+
+
+def _page_ids(page: list[tuple[float, int]]) -> list[int]:
+    return [-negated_id for _, negated_id in sorted(page, reverse=True)]
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids", "top")
+
+    def __init__(self):
+        self.children: dict[str, "_TrieNode"] = {}
+        # market id -> best field weight of any word below this node
+        self.ids: dict[int, float] = {}
+        # (-score, market id) of the NODE_TOP_K best markets for a query
+        # term ending here, best first
+        self.top: list[tuple[float, int]] = []
+
+
+class _PrefixMatch:
+    """Markets with a word starting with the term. Scores are looked up, not copied."""
+
+    __slots__ = ("node", "exact")
+
+    def __init__(self, node: _TrieNode, exact: dict[int, float]):
+        self.node = node
+        self.exact = exact
+
+    def __len__(self) -> int:
+        return len(self.node.ids)
+
+    def score(self, market_id: int) -> float | None:
+        weight = self.node.ids.get(market_id)
+        if weight is None:
+            return None
+        return _node_score(weight, self.exact.get(market_id))
+
+    @property
+    def best(self) -> float:
+        return -self.node.top[0][0]
+
+    @property
+    def fully_ranked(self) -> bool:
+        return len(self.node.top) == len(self.node.ids)
+
+    def ranked(self):
+        return ((market_id, -score) for score, market_id in self.node.top)
+
+    def ids(self):
+        return self.node.ids.keys()
+
+    def add_scores(self, scores: dict[int, float]) -> None:
+        """Add this term's score to each market in `scores`, all of which match it."""
+        ids = self.node.ids
+        for market_id in scores:
+            scores[market_id] += ids[market_id]
+        for market_id in self.exact.keys() & scores.keys():
+            scores[market_id] += max(0, self.exact[market_id] + EXACT_BONUS - ids[market_id])
+
+
+class _FuzzyMatch:
+    """Markets with a word similar to the term, scored up front."""
+
+    __slots__ = ("scores", "best")
+
+    fully_ranked = False
+
+    def __init__(self, scores: dict[int, float]):
+        self.scores = scores
+        self.best = max(scores.values())
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def score(self, market_id: int) -> float | None:
+        return self.scores.get(market_id)
+
+    def ranked(self):
+        return iter(())
+
+    def ids(self):
+        return self.scores.keys()
+
+    def add_scores(self, scores: dict[int, float]) -> None:
+        for market_id in scores:
+            scores[market_id] += self.scores[market_id]
+
+
+class MarketSearchIndex:
+    """
+    In-memory search over market college names and descriptions.
+
+    A prefix trie answers "starts with" lookups with the matching market ids
+    stored on every node, and a trigram index over the vocabulary catches
+    typos. Results are ranked by field weight (name over description), with
+    a bonus for whole-word matches and a penalty for fuzzy ones.
+
+    Each node also keeps its NODE_TOP_K best markets in rank order, so a
+    one-word query reads a page off the node instead of ranking every id
+    below it. Multi-word and filtered queries walk the rarest term's
+    ranked markets and stop once the rest can no longer make the page.
+    When the ranked markets run out before that is certain, they intersect
+    every term's ids (and the filter's), starting from the smallest set.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        self.built = False
+
+    def _reset(self):
+        self._root = _TrieNode()
+        self._words: dict[str, dict[int, float]] = {}
+        self._trigrams: dict[str, set[str]] = defaultdict(set)
+        self._docs: dict[int, tuple[str, str, dict[str, float]]] = {}
+        # status / category -> market ids, so filters are set intersections
+        self._by_status: dict[str, set[int]] = defaultdict(set)
+        self._by_category: dict[str, set[int]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def rebuild(self, db: Session) -> int:
+        """Replace the index with every market in the database."""
+        rows = db.query(
+            Market.id, Market.college_name, Market.description, Market.status, Market.category
+        ).all()
+
+        # Build off to the side so searches are not blocked meanwhile
+        fresh = MarketSearchIndex()
+        for market_id, college_name, description, status, category in rows:
+            fresh._add(market_id, college_name, description, status.value, category.value)
+
+        with self._lock:
+            self._root = fresh._root
+            self._words = fresh._words
+            self._trigrams = fresh._trigrams
+            self._docs = fresh._docs
+            self._by_status = fresh._by_status
+            self._by_category = fresh._by_category
+            self.built = True
+
+        return len(rows)
+
+    def ensure_built(self, db: Session) -> None:
+        """Build synchronously if a search arrives before the background build finished."""
+        if not self.built:
+            self.rebuild(db)
+
+    def add(self, market: Market) -> None:
+        with self._lock:
+            self._remove(market.id)
+            self._add(
+                market.id, market.college_name, market.description,
+                market.status.value, market.category.value
+            )
+
+    def remove(self, market_id: int) -> None:
+        with self._lock:
+            self._remove(market_id)
+
+    def update_status(self, market_id: int, status: str) -> None:
+        with self._lock:
+            doc = self._docs.get(market_id)
+            if doc:
+                self._by_status[doc[0]].discard(market_id)
+                self._by_status[status].add(market_id)
+                self._docs[market_id] = (status, doc[1], doc[2])
+
+    def search(
+        self,
+        q: str,
+        status: str | None = None,
+        category: str | None = None,
+        limit: int = 20
+    ) -> list[int]:
+        """
+        Return up to `limit` market ids ranked best first. Every query word
+        must match a word in the market by prefix or, failing that, by
+        trigram similarity.
+        """
+        terms = tokenize(q)
+        if not terms:
+            return []
+
+        with self._lock:
+            matches = []
+            for term in terms:
+                match = self._match(term)
+                if match is None:
+                    return []
+                matches.append(match)
+
+            # Walk from the rarest term, so the fewest markets are looked up
+            matches.sort(key=len)
+            first, rest = matches[0], matches[1:]
+            allowed = None
+            if status:
+                allowed = self._by_status.get(status, set())
+            if category:
+                in_category = self._by_category.get(category, set())
+                allowed = in_category if allowed is None else allowed & in_category
+
+            # Walk the first term's ranked markets until none further down can
+            # beat the page so far, even with the other terms' best scores
+            bound = sum(match.best for match in rest)
+            page: list[tuple[float, int]] = []  # min-heap of (score, -market id)
+            ceiling = None  # best possible rank of a market the walk has not reached
+            for market_id, score in first.ranked():
+                ceiling = (score + bound, -market_id)
+                if len(page) == limit and page[0] > ceiling:
+                    return _page_ids(page)
+                if allowed is not None and market_id not in allowed:
+                    continue
+                for match in rest:
+                    term_score = match.score(market_id)
+                    if term_score is None:
+                        break
+                    score += term_score
+                else:
+                    if len(page) < limit:
+                        heapq.heappush(page, (score, -market_id))
+                    elif (score, -market_id) > page[0]:
+                        heapq.heapreplace(page, (score, -market_id))
+            # Unranked markets rank below the last ranked one, so a full page
+            # that beats it is final
+            if first.fully_ranked or (len(page) == limit and page[0] >= ceiling):
+                return _page_ids(page)
+
+            sources = [match.ids() for match in matches]
+            if allowed is not None:
+                sources.append(allowed)
+            sources.sort(key=len)
+            candidates = set(sources[0])
+            for ids in sources[1:]:
+                candidates = {market_id for market_id in candidates if market_id in ids}
+                if not candidates:
+                    return []
+
+            scores = dict.fromkeys(candidates, 0.0)
+            for match in matches:
+                match.add_scores(scores)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [market_id for market_id, _ in best]
+
+    def _match(self, term: str) -> _PrefixMatch | _FuzzyMatch | None:
+        node = self._root
+        for char in term:
+            node = node.children.get(char)
+            if node is None:
+                break
+        else:
+            if node.ids:
+                return _PrefixMatch(node, self._words.get(term, {}))
+
+        if len(term) < 3:
+            return None
+
+        # No prefix match: fall back to words sharing enough trigrams
+        term_grams = trigrams(term)
+        shared: dict[str, int] = defaultdict(int)
+        for gram in term_grams:
+            for word in self._trigrams.get(gram, ()):
+                shared[word] += 1
+
+        scores: dict[int, float] = {}
+        for word, count in shared.items():
+            similarity = count / (len(term_grams) + len(word) + 1 - count)
+            if similarity < MIN_SIMILARITY:
+                continue
+            for market_id, weight in self._words[word].items():
+                score = weight * similarity * FUZZY_PENALTY
+                if score > scores.get(market_id, 0):
+                    scores[market_id] = score
+
+        return _FuzzyMatch(scores) if scores else None
+
+    def _add(self, market_id, college_name, description, status, category):
+        words: dict[str, float] = {}
+        for word in tokenize(description):
+            words[word] = DESCRIPTION_WEIGHT
+        for word in tokenize(college_name):
+            words[word] = NAME_WEIGHT
+
+        self._docs[market_id] = (status, category, words)
+        self._by_status[status].add(market_id)
+        self._by_category[category].add(market_id)
+
+        nodes: dict[str, _TrieNode] = {}
+        for word, weight in words.items():
+            postings = self._words.get(word)
+            if postings is None:
+                postings = self._words[word] = {}
+                for gram in trigrams(word):
+                    self._trigrams[gram].add(word)
+            postings[market_id] = weight
+
+            node = self._root
+            for end, char in enumerate(word, 1):
+                node = node.children.setdefault(char, _TrieNode())
+                if node.ids.get(market_id, 0) < weight:
+                    node.ids[market_id] = weight
+                nodes[word[:end]] = node
+
+        # Rank once every word is in, when each node's score is final
+        for prefix, node in nodes.items():
+            entry = (-_node_score(node.ids[market_id], words.get(prefix)), market_id)
+            if len(node.top) < NODE_TOP_K or entry < node.top[-1]:
+                bisect.insort(node.top, entry)
+                del node.top[NODE_TOP_K:]
+
+    def _remove(self, market_id):
+        doc = self._docs.pop(market_id, None)
+        if doc is None:
+            return
+        self._by_status[doc[0]].discard(market_id)
+        self._by_category[doc[1]].discard(market_id)
+
+        for word in doc[2]:
+            postings = self._words[word]
+            postings.pop(market_id, None)
+            if not postings:
+                del self._words[word]
+                for gram in trigrams(word):
+                    self._trigrams[gram].discard(word)
+
+        for word in doc[2]:
+            node = self._root
+            for end, char in enumerate(word, 1):
+                node = node.children.get(char)
+                if node is None:
+                    break
+                if node.ids.pop(market_id, None) is None:
+                    continue
+                ranked = len(node.top)
+                node.top = [entry for entry in node.top if entry[1] != market_id]
+                if len(node.top) < ranked and len(node.ids) > len(node.top):
+                    # Refill the freed slot from the ids below this node
+                    exact = self._words.get(word[:end], {})
+                    node.top = heapq.nsmallest(NODE_TOP_K, (
+                        (-_node_score(weight, exact.get(other_id)), other_id)
+                        for other_id, weight in node.ids.items()
+                    ))
+
+
+search_index = MarketSearchIndex()
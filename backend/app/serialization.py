@@ -0,0 +1,302 @@
+"""
+Fast-path JSON for list endpoints.
+
+Rows are selected as plain tuples and dumped straight to bytes with orjson,
+skipping per-row Pydantic validation and FastAPI's generic encoder. The
+output must stay byte-for-byte identical to what the response models
+(MarketResponse, PortfolioSummary, TransactionResponse, ...) produce: same key
+order, floats for float fields, naive ISO datetimes.
+"""
+from datetime import datetime
+
+import orjson
+from fastapi import Response
+from sqlalchemy import select, and_, or_, union_all
+from sqlalchemy.orm import Session
+
+from .models import (
+    User, Market, MarketStats, MarketOutcome, Position, Transaction, ArchivedTransaction, TransactionSummary,
+    PortfolioSnapshot,
+    MarketCategory, OutcomeType,
+    window_volume, window_price_change
+)
+
+
+def json_response(content: bytes) -> Response:
+    return Response(content=content, media_type="application/json")
+
+
+def market_list_query(category: MarketCategory | None = None):
+    query = select(
+        Market.college_name,
+        Market.description,
+        Market.id,
+        Market.yes_price,
+        Market.no_price,
+        Market.status,
+        Market.total_yes_shares,
+        Market.total_no_shares,
+        Market.resolved_outcome,
+        Market.resolution_date,
+        Market.category,
+        Market.created_at,
+        Market.close_at,
+        Market.resolve_at,
+        MarketStats.market_id,
+        MarketStats.trade_count,
+        MarketStats.traded_notional,
+        MarketStats.unique_traders,
+        MarketStats.open_interest,
+        MarketStats.volume_buckets,
+        Market.market_type,
+    ).outerjoin(MarketStats, MarketStats.market_id == Market.id)
+
+    if category:
+        query = query.where(Market.category == category)
+
+    return query.order_by(Market.id)
+
+
+def dump_markets(db: Session, category: MarketCategory | None = None) -> bytes:
+    """Serialize the /markets list (same shape as list[MarketResponse])."""
+    markets = []
+    for (
+        college_name, description, market_id, yes_price, no_price, status,
+        total_yes_shares, total_no_shares, resolved_outcome, resolution_date,
+        market_category, created_at, close_at, resolve_at, stats_id, trade_count, traded_notional,
+        unique_traders, open_interest, volume_buckets, market_type
+    ) in db.execute(market_list_query(category)):
+        markets.append({
+            "college_name": college_name,
+            "description": description,
+            "id": market_id,
+            "yes_price": yes_price,
+            "no_price": no_price,
+            "status": status.value,
+            "total_yes_shares": total_yes_shares,
+            "total_no_shares": total_no_shares,
+            "resolved_outcome": resolved_outcome,
+            "resolution_date": resolution_date,
+            "category": market_category.value,
+            "created_at": created_at,
+            "close_at": close_at,
+            "resolve_at": resolve_at,
+            "stats": None if stats_id is None else {
+                "trade_count": trade_count,
+                "traded_notional": traded_notional,
+                "unique_traders": unique_traders,
+                "open_interest": open_interest,
+                "volume_24h": window_volume(volume_buckets),
+                "price_change_24h": window_price_change(volume_buckets),
+            },
+            "market_type": market_type.value,
+        })
+
+    return orjson.dumps(markets)
+
+
+def dump_portfolio(db: Session, user: User) -> bytes:
+    """Serialize /portfolio (same shape as PortfolioSummary) from one joined query."""
+    rows = db.execute(
+        select(
+            Position.id,
+            Position.market_id,
+            Position.outcome,
+            Position.shares,
+            Position.average_cost,
+            Market.college_name,
+            Market.yes_price,
+            Market.no_price,
+            Market.status,
+            MarketOutcome.label,
+            MarketOutcome.price,
+        )
+        .join(Market, Market.id == Position.market_id)
+        .outerjoin(MarketOutcome, MarketOutcome.id == Position.outcome_id)
+        .where(and_(Position.user_id == user.id, Position.shares > 0))
+        .order_by(Position.id)
+    )
+
+    positions = []
+    total_invested = 0
+    total_current_value = 0
+
+    for (
+        position_id, market_id, outcome, shares, average_cost,
+        college_name, yes_price, no_price, market_status, outcome_label, outcome_price
+    ) in rows:
+        if outcome_price is not None:
+            current_price = outcome_price
+        else:
+            current_price = yes_price if outcome == OutcomeType.YES else no_price
+        cost_basis = shares * average_cost
+        current_value = shares * current_price
+        unrealized_pnl = current_value - cost_basis
+
+        positions.append({
+            "id": position_id,
+            "market_id": market_id,
+            "outcome": outcome_label or outcome.value,
+            "shares": shares,
+            "average_cost": average_cost,
+            "current_value": current_value,
+            "cost_basis": cost_basis,
+            "unrealized_pnl": unrealized_pnl,
+            "unrealized_pnl_percent": (unrealized_pnl / cost_basis * 100) if cost_basis > 0 else 0.0,
+            "market_college_name": college_name,
+            "market_yes_price": yes_price,
+            "market_no_price": no_price,
+            "market_status": market_status.value,
+        })
+
+        total_invested += cost_basis
+        total_current_value += current_value
+
+    total_pnl = total_current_value - total_invested
+
+    return orjson.dumps({
+        "balance": user.balance,
+        "total_invested": total_invested,
+        "total_current_value": total_current_value,
+        "total_unrealized_pnl": total_pnl,
+        "total_unrealized_pnl_percent": (total_pnl / total_invested * 100) if total_invested > 0 else 0.0,
+        "positions": positions,
+    })
+
+
+def _history_query(table, user_id: int, cursor: tuple[datetime, int] | None, limit: int | None):
+    query = (
+        select(
+            table.id,
+            table.market_id,
+            table.transaction_type,
+            table.outcome,
+            table.shares,
+            table.price_per_share,
+            table.total_cost,
+            table.timestamp,
+            Market.college_name,
+            MarketOutcome.label,
+        )
+        .join(Market, Market.id == table.market_id)
+        .outerjoin(MarketOutcome, MarketOutcome.id == table.outcome_id)
+        .where(table.user_id == user_id)
+    )
+    if cursor is not None:
+        timestamp, transaction_id = cursor
+        query = query.where(or_(
+            table.timestamp < timestamp,
+            and_(table.timestamp == timestamp, table.id < transaction_id)
+        ))
+    if limit is not None:
+        query = query.order_by(table.timestamp.desc(), table.id.desc()).limit(limit)
+    return query.subquery()
+
+
+def dump_transactions(
+    db: Session,
+    user: User,
+    limit: int | None = None,
+    cursor: tuple[datetime, int] | None = None
+) -> bytes:
+    """
+    Serialize /transactions (same shape as list[TransactionResponse]),
+    newest first, across the live and archived tables. With `limit`, each
+    side is cut to `limit` rows before they are merged; `cursor` is the
+    (timestamp, id) of the last row of the previous page.
+    """
+    live = _history_query(Transaction, user.id, cursor, limit)
+    archived = _history_query(ArchivedTransaction, user.id, cursor, limit)
+    history = union_all(select(live), select(archived)).subquery()
+
+    rows = db.execute(
+        select(history)
+        .order_by(history.c.timestamp.desc(), history.c.id.desc())
+        .limit(limit)
+    )
+
+    return orjson.dumps([
+        {
+            "id": transaction_id,
+            "market_id": market_id,
+            "transaction_type": transaction_type.value,
+            "outcome": outcome_label or outcome.value,
+            "shares": shares,
+            "price_per_share": price_per_share,
+            "total_cost": total_cost,
+            "timestamp": timestamp,
+            "market_college_name": college_name,
+        }
+        for (
+            transaction_id, market_id, transaction_type, outcome, shares,
+            price_per_share, total_cost, timestamp, college_name, outcome_label
+        ) in rows
+    ])
+
+
+def transaction_cursor(db: Session, user: User, transaction_id: int) -> tuple[datetime, int] | None:
+    """The paging cursor for one of the user's transactions, live or archived."""
+    for table in (Transaction, ArchivedTransaction):
+        timestamp = db.scalar(
+            select(table.timestamp).where(table.id == transaction_id, table.user_id == user.id)
+        )
+        if timestamp is not None:
+            return timestamp, transaction_id
+    return None
+
+
+def dump_transaction_summaries(db: Session, user: User) -> bytes:
+    """
+    Serialize /transactions/summary (same shape as
+    list[TransactionSummaryResponse]), most recently traded first.
+    """
+    rows = db.execute(
+        select(
+            TransactionSummary.market_id,
+            Market.college_name,
+            TransactionSummary.trade_count,
+            TransactionSummary.shares,
+            TransactionSummary.total_cost,
+            TransactionSummary.first_trade_at,
+            TransactionSummary.last_trade_at,
+        )
+        .join(Market, Market.id == TransactionSummary.market_id)
+        .where(TransactionSummary.user_id == user.id)
+        .order_by(TransactionSummary.last_trade_at.desc(), TransactionSummary.market_id.desc())
+    )
+
+    return orjson.dumps([
+        {
+            "market_id": market_id,
+            "market_college_name": college_name,
+            "trade_count": trade_count,
+            "shares": shares,
+            "total_cost": total_cost,
+            "first_trade_at": first_trade_at,
+            "last_trade_at": last_trade_at,
+        }
+        for market_id, college_name, trade_count, shares, total_cost, first_trade_at, last_trade_at in rows
+    ])
+
+
+def dump_portfolio_history(db: Session, user: User, since: datetime) -> bytes:
+    """Serialize stored portfolio snapshots (same shape as list[PortfolioHistoryPoint])."""
+    rows = db.execute(
+        select(
+            PortfolioSnapshot.taken_at,
+            PortfolioSnapshot.balance,
+            PortfolioSnapshot.positions_value,
+        )
+        .where(PortfolioSnapshot.user_id == user.id, PortfolioSnapshot.taken_at >= since)
+        .order_by(PortfolioSnapshot.taken_at)
+    )
+
+    return orjson.dumps([
+        {
+            "timestamp": taken_at,
+            "balance": balance,
+            "positions_value": positions_value,
+            "total_value": balance + positions_value,
+        }
+        for taken_at, balance, positions_value in rows
+    ])
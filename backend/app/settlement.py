@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Session, joinedload
+
+from .models import Market, Position, MarketStatus, MarketType, LedgerEntryType
+from .ledger import post_transfer, market_account
+from .market_stats import record_resolution
+from .pricing import outcome_payouts
+
+
+def settle_market(db: Session, market: Market, outcome: str) -> tuple[int, int]:
+    """
+    Resolve a market and pay out winners. Each winning share pays 100 cents
+    out of the market's escrow account. `outcome` is YES/NO, or the winning
+    outcome's label for multi-outcome markets.
+
+    Does not commit. Returns (winners_count, total_payout).
+    """
+    market.status = MarketStatus.RESOLVED
+    market.resolved_outcome = outcome
+    market.resolution_date = datetime.utcnow()
+    record_resolution(db, market)
+    
+    if market.market_type == MarketType.MULTI:
+        return settle_multi_market(db, market, outcome)
+    
+    positions = db.query(Position).options(joinedload(Position.user)).filter(
+        Position.market_id == market.id
+    ).all()
+    
+    winners_count = 0
+    total_payout = 0
+    
+    for position in positions:
+        if position.shares > 0 and position.outcome.value == outcome:
+            payout = position.shares * 100
+            post_transfer(
+                db, position.user, payout, LedgerEntryType.PAYOUT,
+                market_account(market.id), market_id=market.id
+            )
+            winners_count += 1
+            total_payout += payout
+    
+    return winners_count, total_payout
+
+
+def settle_multi_market(db: Session, market: Market, outcome: str) -> tuple[int, int]:
+    """Pay out a multi-outcome market, computing every position's payout in one vector op."""
+    winner = next(o.id for o in market.outcomes if o.label == outcome)
+    
+    positions = db.query(Position).options(joinedload(Position.user)).filter(
+        Position.market_id == market.id,
+        Position.shares > 0
+    ).all()
+    
+    payouts = outcome_payouts(
+        [position.outcome_id for position in positions],
+        [position.shares for position in positions],
+        winner
+    )
+    
+    winners_count = 0
+    total_payout = 0
+    
+    for position, payout in zip(positions, payouts):
+        if payout:
+            post_transfer(
+                db, position.user, payout, LedgerEntryType.PAYOUT,
+                market_account(market.id), market_id=market.id
+            )
+            winners_count += 1
+            total_payout += payout
+    
+    return winners_count, total_payout
@@ -0,0 +1,304 @@
+"""
+Deterministic trade-log replay.
+
+Streams fills through the same pricing and position math as execute_trade,
+against plain in-memory dicts instead of the database, so exported history
+or synthetic traffic can be replayed at hundreds of thousands of fills per
+second to benchmark or to compare pricing rules.
+"""
+import csv
+import math
+import random
+import time
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from .models import Market, MarketStatus, MarketType, Transaction, ArchivedTransaction
+from .pricing import price_after_buy, average_cost_after_buy
+from .ledger import STARTING_BALANCE
+
+
+PricingRule = Callable[[int, int, str, int], tuple[int, int]]
+
+# A fill is (user_id, market_id, outcome, shares, recorded_price). recorded_price
+# is the price the fill executed at in production, or None for synthetic fills.
+# A resolution travels in the same stream as (None, market_id, outcome, 0, None).
+Fill = tuple[int | None, int, str, int, int | None]
+
+
+def price_after_buy_sqrt(yes_price: int, no_price: int, outcome: str, shares: int) -> tuple[int, int]:
+    """Candidate rule: impact grows with the square root of size (1 cent per ~10 shares at first)."""
+    price_change = max(1, round(math.sqrt(shares) / 3))
+
+    if outcome == "YES":
+        yes_price = min(99, yes_price + price_change)
+        return yes_price, 100 - yes_price
+
+    no_price = min(99, no_price + price_change)
+    return 100 - no_price, no_price
+
+
+PRICING_RULES: dict[str, PricingRule] = {
+    "linear": price_after_buy,
+    "sqrt": price_after_buy_sqrt,
+}
+
+
+class ReplayResult:
+    def __init__(self, engine: "ReplayEngine", fills: int, rejected: int, price_mismatches: int, elapsed: float):
+        self.fills = fills
+        self.rejected = rejected
+        self.price_mismatches = price_mismatches
+        self.elapsed = elapsed
+        self.resolved = engine.resolved
+        self.prices = {
+            market_id: (engine.yes_price[market_id], engine.no_price[market_id])
+            for market_id in engine.yes_price
+        }
+        self.balances = dict(engine.balances)
+        self.pnl = engine.pnl()
+
+    @property
+    def accepted(self) -> int:
+        return self.fills - self.rejected
+
+    @property
+    def fills_per_second(self) -> float:
+        return self.fills / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def accepted_per_second(self) -> float:
+        return self.accepted / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ReplayEngine:
+    """
+    In-memory state store for replaying fills.
+
+    Users start with STARTING_BALANCE the first time they appear. Fills the
+    user can't afford are rejected, as in execute_trade. Markets seen for
+    the first time open at the fill's recorded price (or `opening_yes_price`
+    for synthetic fills). resolve_market() pays out winning positions as
+    settlement does.
+    """
+
+    def __init__(
+        self,
+        pricing_rule: PricingRule = price_after_buy,
+        starting_balance: int = STARTING_BALANCE,
+        opening_yes_price: int = 50
+    ):
+        self.pricing_rule = pricing_rule
+        self.starting_balance = starting_balance
+        self.opening_yes_price = opening_yes_price
+
+        self.yes_price: dict[int, int] = {}
+        self.no_price: dict[int, int] = {}
+        self.balances: dict[int, int] = {}
+        # market_id -> {(user_id, outcome): [shares, average_cost]}
+        self.positions: dict[int, dict[tuple[int, str], list[int]]] = {}
+        self.resolved = 0
+
+    def open_market(self, market_id: int, yes_price: int) -> None:
+        self.yes_price[market_id] = yes_price
+        self.no_price[market_id] = 100 - yes_price
+
+    def resolve_market(self, market_id: int, outcome: str) -> None:
+        """Pay 100 cents per winning share and close out every position in the market."""
+        balances = self.balances
+        for (user_id, held_outcome), (shares, _) in self.positions.pop(market_id, {}).items():
+            if held_outcome == outcome:
+                balances[user_id] += shares * 100
+        self.resolved += 1
+
+    def run(self, fills: Iterable[Fill]) -> ReplayResult:
+        # Locals keep attribute lookups out of the hot loop
+        yes = self.yes_price
+        no = self.no_price
+        balances = self.balances
+        positions = self.positions
+        rule = self.pricing_rule
+        average_cost = average_cost_after_buy
+        starting_balance = self.starting_balance
+        opening_yes_price = self.opening_yes_price
+
+        count = rejected = mismatches = 0
+        started = time.perf_counter()
+
+        for user_id, market_id, outcome, shares, recorded_price in fills:
+            if user_id is None:
+                self.resolve_market(market_id, outcome)
+                continue
+            count += 1
+
+            if market_id not in yes:
+                if recorded_price is None:
+                    opening = opening_yes_price
+                else:
+                    opening = recorded_price if outcome == "YES" else 100 - recorded_price
+                yes[market_id] = opening
+                no[market_id] = 100 - opening
+
+            price = yes[market_id] if outcome == "YES" else no[market_id]
+            if recorded_price is not None and recorded_price != price:
+                mismatches += 1
+
+            cost = shares * price
+            balance = balances.get(user_id, starting_balance)
+            if balance < cost:
+                rejected += 1
+                continue
+            balances[user_id] = balance - cost
+
+            market_positions = positions.get(market_id)
+            if market_positions is None:
+                market_positions = positions[market_id] = {}
+            key = (user_id, outcome)
+            position = market_positions.get(key)
+            if position is None:
+                market_positions[key] = [shares, price]
+            else:
+                position[1] = average_cost(position[0], position[1], shares, price)
+                position[0] += shares
+
+            yes[market_id], no[market_id] = rule(yes[market_id], no[market_id], outcome, shares)
+
+        elapsed = time.perf_counter() - started
+        return ReplayResult(self, count, rejected, mismatches, elapsed)
+
+    def pnl(self) -> dict[int, int]:
+        """Each user's profit or loss with open positions marked at final prices."""
+        value = dict(self.balances)
+        for market_id, market_positions in self.positions.items():
+            for (user_id, outcome), (shares, _) in market_positions.items():
+                price = self.yes_price[market_id] if outcome == "YES" else self.no_price[market_id]
+                value[user_id] += shares * price
+        return {user_id: total - self.starting_balance for user_id, total in value.items()}
+
+
+def export_transactions(db: Session, path: str, batch_size: int = 10000) -> int:
+    """
+    Stream the binary-market transaction log, archived rows included, to
+    CSV in execution order, with each resolved market's resolution placed
+    after the last fill before its resolution_date. Returns the row count.
+    """
+    log = union_all(*(
+        select(
+            table.id,
+            table.timestamp,
+            table.user_id,
+            table.market_id,
+            table.outcome,
+            table.shares,
+            table.price_per_share
+        ).where(table.outcome_id.is_(None))  # the replay engine prices binary markets only
+        for table in (Transaction, ArchivedTransaction)
+    )).subquery()
+    rows = db.execute(
+        select(log)
+        .order_by(log.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    # One per resolved market, so these fit in memory
+    resolutions = db.execute(
+        select(Market.resolution_date, Market.id, Market.resolved_outcome)
+        .where(
+            Market.market_type == MarketType.BINARY,
+            Market.status == MarketStatus.RESOLVED,
+            Market.resolution_date.is_not(None)
+        )
+        .order_by(Market.resolution_date, Market.id)
+    ).all()
+    resolutions.reverse()
+
+    count = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["event", "id", "timestamp", "user_id", "market_id", "outcome", "shares", "price_per_share"])
+
+        def write_resolution():
+            nonlocal count
+            resolved_at, market_id, outcome = resolutions.pop()
+            writer.writerow(["resolve", "", resolved_at.isoformat(), "", market_id, outcome, "", ""])
+            count += 1
+
+        for transaction_id, timestamp, user_id, market_id, outcome, shares, price in rows:
+            while resolutions and resolutions[-1][0] <= timestamp:
+                write_resolution()
+            writer.writerow([
+                "fill", transaction_id, timestamp.isoformat(), user_id, market_id, outcome.value, shares, price
+            ])
+            count += 1
+        while resolutions:
+            write_resolution()
+
+    return count
+
+
+def read_fills(path: str) -> Iterator[Fill]:
+    """Stream fills and resolutions from a CSV written by export_transactions."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for event, _, _, user_id, market_id, outcome, shares, price in reader:
+            if event == "resolve":
+                yield None, int(market_id), outcome, 0, None
+            else:
+                yield int(user_id), int(market_id), outcome, int(shares), int(price)
+
+
+def synthetic_fills(
+    engine: ReplayEngine,
+    count: int,
+    markets: int = 100,
+    users: int = 1000,
+    mix: dict[str, float] | None = None,
+    seed: int = 0,
+    resolve_every: int = 20
+) -> Iterator[Fill]:
+    """
+    Generate `count` fills from a seeded population of traders.
+
+    Trader behaviours (weights in `mix`):
+      noise       buys either side at random
+      momentum    buys the side that is above 50
+      contrarian  buys the side that is below 50
+
+    Sizes are mostly small with an occasional large order. Every
+    `resolve_every` fills (0 for never) the next market in turn resolves,
+    YES with probability equal to its YES price, and reopens at a fresh
+    price, so winners get paid and traders keep enough balance to trade.
+    The generator reads live prices from `engine` and resolves markets on
+    it, so it must be consumed by engine.run.
+    """
+    rng = random.Random(seed)
+    mix = mix or {"noise": 0.6, "momentum": 0.2, "contrarian": 0.2}
+
+    for market_id in range(1, markets + 1):
+        engine.open_market(market_id, rng.randint(10, 90))
+
+    behaviours = rng.choices(list(mix), weights=list(mix.values()), k=users)
+    sizes = [1, 5, 10, 10, 25, 50, 50, 100, 100, 250, 500, 1000]
+    yes = engine.yes_price
+
+    for fill in range(1, count + 1):
+        if resolve_every and fill % resolve_every == 0:
+            resolving = fill // resolve_every % markets + 1
+            engine.resolve_market(resolving, "YES" if rng.randrange(100) < yes[resolving] else "NO")
+            engine.open_market(resolving, rng.randint(10, 90))
+
+        user = rng.randrange(users)
+        market_id = rng.randint(1, markets)
+        behaviour = behaviours[user]
+
+        if behaviour == "momentum":
+            outcome = "YES" if yes[market_id] >= 50 else "NO"
+        elif behaviour == "contrarian":
+            outcome = "YES" if yes[market_id] < 50 else "NO"
+        else:
+            outcome = "YES" if rng.random() < 0.5 else "NO"
+
+        yield user + 1, market_id, outcome, rng.choice(sizes), None
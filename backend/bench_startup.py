@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child():
+    """Time one cold start in this (fresh) interpreter and print it as JSON"""
+    started = time.perf_counter()
+    # Third-party imports first, so what's left is the app's own import cost
+    import fastapi  # noqa: F401
+    import sqlalchemy.orm  # noqa: F401
+    dependencies = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    asyncio.run(app.router.startup())
+    ready = time.perf_counter()
+
+    # First request straight through the ASGI app, no HTTP client needed
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/markets", "raw_path": b"/markets",
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000),
+    }
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    asyncio.run(app(scope, receive, send))
+    served = time.perf_counter()
+
+    print(json.dumps({
+        "dependencies_ms": (dependencies - started) * 1000,
+        "import_ms": (imported - dependencies) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first_request_ms": (served - ready) * 1000,
+        "total_ms": (served - started) * 1000,
+        "status": statuses[0] if statuses else None,
+    }))
+    os._exit(0)  # don't wait on background job threads
+
+
+def configured_database() -> str:
+    """Path of the SQLite database DATABASE_URL (or .env) points at"""
+    from app.database import DATABASE_URL
+
+    if not DATABASE_URL.startswith("sqlite:///"):
+        sys.exit("bench_startup.py only runs against copies of a SQLite DATABASE_URL")
+    return DATABASE_URL.removeprefix("sqlite:///")
+
+
+def copy_database(source: str, path: str) -> str:
+    """Copy `source` (or start empty if it doesn't exist) to `path` and return its URL"""
+    if os.path.exists(source):
+        shutil.copy(source, path)
+    else:
+        open(path, "wb").close()
+    return f"sqlite:///{path}"
+
+
+def run(mode: str, runs: int, source: str) -> dict:
+    samples = []
+    for _ in range(runs):
+        # A fresh copy each run, so every migrate run starts from the same schema
+        with tempfile.TemporaryDirectory() as scratch:
+            env = {
+                **os.environ,
+                "DATABASE_URL": copy_database(source, os.path.join(scratch, "bench.db")),
+                "MIGRATE_ON_STARTUP": "1" if mode == "migrate" else "0",
+            }
+            output = subprocess.run(
+                [sys.executable, __file__, "--child"],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ("dependencies_ms", "import_ms", "startup_ms", "first_request_ms", "total_ms")
+    }
+
+
+def main():
+    """Compare cold starts with and without schema work on boot"""
+    parser = argparse.ArgumentParser(description="Benchmark worker import time and cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    print(f"\n⏱️  COLD START (median of {args.runs} runs, on a copy of the database)")
+    print("-" * 84)
+    print(f"{'mode':<12}{'deps':>12}{'app import':>12}{'startup':>12}{'1st request':>14}{'total':>12}")
+    with tempfile.TemporaryDirectory() as scratch:
+        # Every run works on a copy, so the real database file is never touched.
+        # Lazy workers expect `python migrate.py` to have run at deploy.
+        original = configured_database()
+        migrated = os.path.join(scratch, "migrated.db")
+        subprocess.run(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrate.py")],
+            env={**os.environ, "DATABASE_URL": copy_database(original, migrated)},
+            capture_output=True, check=True
+        )
+        results = {"migrate": run("migrate", args.runs, original), "lazy": run("lazy", args.runs, migrated)}
+
+    for mode, result in results.items():
+        print(
+            f"{mode:<12}{result['dependencies_ms']:>10.0f}ms{result['import_ms']:>10.0f}ms"
+            f"{result['startup_ms']:>10.0f}ms{result['first_request_ms']:>12.0f}ms{result['total_ms']:>10.0f}ms"
+        )
+    print("\n   deps = importing fastapi and sqlalchemy, which the app can't trim\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+from app.database import DATABASE_URL
+from app.migrations import migrate
+
+
+def main():
+    """Upgrade the schema and run backfills, once per deploy"""
+    print(f"\n🛠️  Migrating {DATABASE_URL}")
+    
+    added = migrate()
+    
+    if added:
+        print(f"   Added columns: {', '.join(added)}")
+    print("✅ Database is up to date\n")
+
+
+if __name__ == "__main__":
+    main()
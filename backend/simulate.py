@@ -0,0 +1,96 @@
+import argparse
+
+from app.database import SessionLocal
+from app.simulation import (
+    ReplayEngine, PRICING_RULES, export_transactions, read_fills, synthetic_fills
+)
+
+
+def print_result(result, top: int):
+    """Print throughput, final prices and P&L extremes"""
+    print("\n" + "="*80)
+    print("🔁 REPLAY RESULT")
+    print("="*80)
+    print(f"\n   Fills: {result.fills} ({result.accepted} accepted, {result.rejected} rejected)")
+    if result.resolved:
+        print(f"   Markets resolved: {result.resolved}")
+    print(f"   Elapsed: {result.elapsed:.3f}s")
+    print(f"   Throughput: {result.fills_per_second:,.0f} fills/s ({result.accepted_per_second:,.0f} accepted/s)")
+    if result.price_mismatches:
+        print(f"   ⚠️  {result.price_mismatches} fill(s) priced differently than recorded")
+
+    print("\n📊 Final prices")
+    for market_id, (yes_price, no_price) in sorted(result.prices.items())[:top]:
+        print(f"   {market_id}: YES {yes_price}¢ / NO {no_price}¢")
+    if len(result.prices) > top:
+        print(f"   ... {len(result.prices) - top} more")
+
+    ranked = sorted(result.pnl.items(), key=lambda item: item[1])
+    print("\n💰 Best P&L")
+    for user_id, pnl in reversed(ranked[-top:]):
+        print(f"   user {user_id}: ${pnl / 100:+.2f} (balance ${result.balances[user_id] / 100:.2f})")
+    print("\n💸 Worst P&L")
+    for user_id, pnl in ranked[:top]:
+        print(f"   user {user_id}: ${pnl / 100:+.2f} (balance ${result.balances[user_id] / 100:.2f})")
+
+    print("\n" + "="*80 + "\n")
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse 'noise=0.6,momentum=0.2,contrarian=0.2'"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Replay or simulate trades in-process")
+    parser.add_argument("--rule", choices=sorted(PRICING_RULES), default="linear", help="pricing rule")
+    parser.add_argument("--top", type=int, default=5, help="rows to show per section")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="export the transaction log to CSV")
+    export.add_argument("path")
+
+    replay = commands.add_parser("replay", help="replay an exported transaction log")
+    replay.add_argument("path")
+
+    synthetic = commands.add_parser("synthetic", help="replay generated traffic")
+    synthetic.add_argument("--fills", type=int, default=1000000)
+    synthetic.add_argument("--markets", type=int, default=100)
+    synthetic.add_argument("--users", type=int, default=1000)
+    synthetic.add_argument("--mix", type=parse_mix, default=None,
+                           help="trader behaviour weights, e.g. noise=0.6,momentum=0.2,contrarian=0.2")
+    synthetic.add_argument("--seed", type=int, default=0)
+    synthetic.add_argument("--resolve-every", type=int, default=20,
+                           help="resolve the next market every N fills (0 = never)")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        db = SessionLocal()
+        try:
+            count = export_transactions(db, args.path)
+        finally:
+            db.close()
+        print(f"\n✅ Exported {count} fill(s) and resolution(s) to {args.path}\n")
+        return
+
+    engine = ReplayEngine(pricing_rule=PRICING_RULES[args.rule])
+
+    if args.command == "replay":
+        fills = read_fills(args.path)
+    else:
+        fills = synthetic_fills(
+            engine, args.fills, markets=args.markets, users=args.users, mix=args.mix, seed=args.seed,
+            resolve_every=args.resolve_every
+        )
+
+    print_result(engine.run(fills), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+# Point the app at a throwaway database before anything imports it
+DB_DIR = tempfile.mkdtemp(prefix="college-market-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'primary.db')}"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrate()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def signup(client):
+    """Register a user and return their auth headers."""
+    def signup(username: str) -> dict:
+        client.post("/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": "password1"
+        })
+        response = client.post("/auth/login", json={"username": username, "password": "password1"})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return signup
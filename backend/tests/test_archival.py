@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.archival import archive_transactions
+from app.models import ArchivedTransaction, Market, Transaction, TransactionSummary
+
+RESOLVED_AT = datetime(2000, 1, 1)
+NOW = RESOLVED_AT + timedelta(days=40)
+
+
+@pytest.fixture
+def resolved_market(db, client, signup):
+    """A market with five trades by one user, resolved long ago. Returns (market id, headers)."""
+    headers = signup("archiver")
+    market = client.post(
+        "/markets", json={"college_name": "Archive U", "yes_price": 40, "no_price": 60}, headers=headers
+    ).json()
+    for outcome, shares in (("YES", 10), ("NO", 5), ("YES", 1), ("YES", 2), ("NO", 3)):
+        response = client.post(
+            "/trade", json={"market_id": market["id"], "outcome": outcome, "shares": shares}, headers=headers
+        )
+        assert response.status_code == 200
+    assert client.post(f"/markets/{market['id']}/resolve", json={"outcome": "YES"}, headers=headers).status_code == 200
+
+    # A later trade elsewhere, so none of these is the newest transaction
+    other = client.post(
+        "/markets", json={"college_name": "Live U", "yes_price": 40, "no_price": 60}, headers=headers
+    ).json()
+    client.post("/trade", json={"market_id": other["id"], "outcome": "YES", "shares": 1}, headers=headers)
+
+    db.query(Market).filter(Market.id == market["id"]).update({"resolution_date": RESOLVED_AT})
+    db.commit()
+    return market["id"], headers
+
+
+def summary(db, market_id: int) -> tuple:
+    row = db.query(TransactionSummary).filter(TransactionSummary.market_id == market_id).one()
+    return row.trade_count, row.shares, row.total_cost
+
+
+def test_archived_history_pages_like_live_history(db, client, resolved_market):
+    market_id, headers = resolved_market
+    history = client.get("/transactions", headers=headers).json()
+    before = [row for row in history if row["market_id"] == market_id]
+
+    assert archive_transactions(db, now=NOW, batch_size=2, pause=0) == 5
+    assert db.query(Transaction).filter(Transaction.market_id == market_id).count() == 0
+    assert db.query(ArchivedTransaction).filter(ArchivedTransaction.market_id == market_id).count() == 5
+
+    assert client.get("/transactions", headers=headers).json() == history
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "before": cursor}
+        page = client.get("/transactions", params=params, headers=headers).json()
+        if not page:
+            break
+        pages += page
+        cursor = page[-1]["id"]
+    assert pages == history
+
+    assert summary(db, market_id) == (5, 21, sum(row["total_cost"] for row in before))
+    assert client.get("/transactions/summary", headers=headers).json() == [{
+        "market_id": market_id,
+        "market_college_name": "Archive U",
+        "trade_count": 5,
+        "shares": 21,
+        "total_cost": sum(row["total_cost"] for row in before),
+        "first_trade_at": before[-1]["timestamp"],
+        "last_trade_at": before[0]["timestamp"],
+    }]
+
+
+def test_newest_transaction_stays_live(db, client, resolved_market):
+    market_id, headers = resolved_market
+    newest = db.query(Transaction).order_by(Transaction.id.desc()).first()
+    db.query(Market).filter(Market.id == newest.market_id).update({
+        "status": "RESOLVED", "resolution_date": RESOLVED_AT
+    })
+    db.commit()
+
+    try:
+        assert archive_transactions(db, now=NOW, pause=0) == 5
+        assert db.get(Transaction, newest.id) is not None
+    finally:
+        db.query(Market).filter(Market.id == newest.market_id).update({"status": "OPEN", "resolution_date": None})
+        db.commit()
+
+
+def test_overlapping_runs_summarize_each_row_once(db, monkeypatch, resolved_market):
+    market_id, _ = resolved_market
+    stale_ids = [row.id for row in db.query(Transaction.id).filter(Transaction.market_id == market_id)]
+
+    assert archive_transactions(db, now=NOW, pause=0) == 5
+    totals = summary(db, market_id)
+
+    # A second worker read the same batch before the first one committed
+    scalars = db.scalars
+    reads = []
+
+    def stale_scalars(query, *args, **kwargs):
+        reads.append(query)
+        result = scalars(query, *args, **kwargs)
+        return result if len(reads) > 1 else type("Stale", (), {"all": lambda self: stale_ids})()
+
+    monkeypatch.setattr(db, "scalars", stale_scalars)
+    assert archive_transactions(db, now=NOW, pause=0) == 0
+    monkeypatch.undo()
+
+    db.expire_all()
+    assert summary(db, market_id) == totals
+    assert db.query(ArchivedTransaction).filter(ArchivedTransaction.market_id == market_id).count() == 5
@@ -0,0 +1,73 @@
+import pytest
+
+from app import auth, concurrency, main
+from app.concurrency import contention
+from app.database import SessionLocal
+from app.models import Market
+
+
+@pytest.fixture
+def trader(client, signup, monkeypatch):
+    """Admin headers and a fresh market, with counters reset and no backoff sleeps."""
+    headers = signup("contender")
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", {"contender"})
+    monkeypatch.setattr(concurrency, "BASE_DELAY_MS", 0)
+    market = client.post(
+        "/markets", json={"college_name": "Contention U", "yes_price": 50, "no_price": 50}, headers=headers
+    ).json()
+    contention.reset()
+    return headers, market["id"]
+
+
+def compete(monkeypatch, times: int) -> None:
+    """Commit an update to the market from another session between a fill's read and its flush."""
+    record_fill = main.record_fill
+    remaining = [times]
+
+    def record_fill_after_competing_write(db, market, *args):
+        if remaining[0]:
+            remaining[0] -= 1
+            other = SessionLocal()
+            try:
+                other.get(Market, market.id).description = f"bumped {remaining[0]}"
+                other.commit()
+            finally:
+                other.close()
+        record_fill(db, market, *args)
+
+    monkeypatch.setattr(main, "record_fill", record_fill_after_competing_write)
+
+
+def trade(client, headers, market_id):
+    return client.post("/trade", json={"market_id": market_id, "outcome": "YES", "shares": 10}, headers=headers)
+
+
+def test_conflicting_fill_is_retried(client, monkeypatch, trader):
+    headers, market_id = trader
+    balance = client.get("/auth/me", headers=headers).json()["balance"]
+    compete(monkeypatch, times=1)
+
+    response = trade(client, headers, market_id)
+
+    assert response.status_code == 200
+    # Charged once, at the price the retry read
+    assert response.json()["new_balance"] == balance - 10 * 50
+    assert client.get("/auth/me", headers=headers).json()["balance"] == balance - 10 * 50
+
+    counters = client.get("/admin/contention", headers=headers).json()
+    assert counters["operations"]["trade"] == {"attempts": 2, "conflicts": 1, "retries": 1, "exhausted": 0}
+    assert counters["hot_keys"] == [{"key": market_id, "conflicts": 1}]
+
+
+def test_fill_that_keeps_conflicting_returns_409(client, monkeypatch, trader):
+    headers, market_id = trader
+    balance = client.get("/auth/me", headers=headers).json()["balance"]
+    monkeypatch.setattr(concurrency, "MAX_ATTEMPTS", 3)
+    compete(monkeypatch, times=3)
+
+    response = trade(client, headers, market_id)
+
+    assert response.status_code == 409
+    assert client.get("/auth/me", headers=headers).json()["balance"] == balance
+    counters = client.get("/admin/contention", headers=headers).json()
+    assert counters["operations"]["trade"] == {"attempts": 3, "conflicts": 3, "retries": 2, "exhausted": 1}
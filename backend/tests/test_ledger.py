@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.ledger import (
+    OPENING_ACCOUNT, balance_at, market_account, post_opening_balances, post_transfer,
+    reconcile_balances, take_balance_snapshots
+)
+from app.migrations import migrate
+from app.models import BalanceSnapshot, LedgerEntry, LedgerEntryType, User
+
+
+@pytest.fixture
+def make_user(db):
+    """Create users with a balance and no ledger history, as before the ledger existed."""
+    created = []
+
+    def make_user(username: str, balance: int = 1000000) -> User:
+        user = User(username=username, email=f"{username}@example.com", hashed_password="x", balance=balance)
+        db.add(user)
+        db.commit()
+        created.append(user.id)
+        return user
+
+    yield make_user
+
+    db.rollback()
+    db.query(BalanceSnapshot).filter(BalanceSnapshot.user_id.in_(created)).delete()
+    journals = select_journals(db, created)
+    db.query(LedgerEntry).filter(LedgerEntry.journal_id.in_(journals)).delete()
+    db.query(User).filter(User.id.in_(created)).delete()
+    db.commit()
+
+
+def select_journals(db, user_ids: list[int]) -> list[str]:
+    return [journal for journal, in db.query(LedgerEntry.journal_id).filter(LedgerEntry.user_id.in_(user_ids))]
+
+
+def mismatch(db, user: User):
+    _, mismatches = reconcile_balances(db)
+    return next((row for row in mismatches if row[0] == user.id), None)
+
+
+def backdate(db, user: User, at: datetime) -> None:
+    """Move every entry of `user` (both legs) to time `at`."""
+    journals = select_journals(db, [user.id])
+    db.query(LedgerEntry).filter(LedgerEntry.journal_id.in_(journals)).update({"created_at": at})
+    db.commit()
+
+
+def test_transfers_post_two_legs_that_sum_to_zero(db, make_user):
+    user = make_user("ledgertrader")
+    post_transfer(db, user, -500, LedgerEntryType.TRADE, market_account(7), market_id=7)
+    db.commit()
+
+    entries = db.query(LedgerEntry).filter(LedgerEntry.journal_id.in_(select_journals(db, [user.id]))).all()
+    assert {(entry.account, entry.amount) for entry in entries} == {(f"user:{user.id}", -500), ("market:7", 500)}
+    assert len({entry.journal_id for entry in entries}) == 1
+    assert user.balance == 1000000 - 500
+
+
+def test_legacy_user_who_traded_is_opened_for_the_rest(db, make_user):
+    user = make_user("legacytrader")
+    post_transfer(db, user, -500, LedgerEntryType.TRADE, market_account(7), market_id=7)
+    db.commit()
+    assert mismatch(db, user) == (user.id, "legacytrader", 999500, -500)
+
+    assert post_opening_balances(db) >= 1
+    db.refresh(user)
+
+    assert mismatch(db, user) is None
+    assert user.balance == 999500
+    opening = db.query(LedgerEntry).filter(
+        LedgerEntry.user_id == user.id, LedgerEntry.entry_type == LedgerEntryType.OPENING
+    ).one()
+    assert opening.amount == 1000000
+
+    # Opened once only, even if the balance drifts afterwards
+    user.balance += 1
+    db.commit()
+    post_opening_balances(db)
+    assert mismatch(db, user) == (user.id, "legacytrader", 999501, 999500)
+
+
+def test_migrate_opens_legacy_accounts(db, make_user):
+    user = make_user("legacyidle", balance=250000)
+    assert mismatch(db, user) is not None
+
+    migrate()
+
+    assert mismatch(db, user) is None
+    assert db.query(LedgerEntry).filter(
+        LedgerEntry.account == OPENING_ACCOUNT, LedgerEntry.amount == -250000
+    ).count() >= 1
+
+
+def test_balance_at_replays_entries_after_the_snapshot(db, make_user):
+    user = make_user("ledgerhistory", balance=0)
+    start = datetime(2026, 1, 1)
+
+    post_transfer(db, user, 1000, LedgerEntryType.GRANT, "platform:grants")
+    db.commit()
+    backdate(db, user, start)
+
+    assert take_balance_snapshots(db, now=start + timedelta(hours=1), lag=timedelta(0)) >= 1
+
+    post_transfer(db, user, -300, LedgerEntryType.TRADE, market_account(7), market_id=7)
+    db.commit()
+    later = db.query(LedgerEntry).filter(LedgerEntry.user_id == user.id, LedgerEntry.amount == -300).one()
+    later.created_at = start + timedelta(hours=2)
+    db.commit()
+
+    assert balance_at(db, user.id, start - timedelta(hours=1)) == 0
+    assert balance_at(db, user.id, start + timedelta(minutes=30)) == 1000
+    assert balance_at(db, user.id, start + timedelta(hours=1, minutes=30)) == 1000
+    assert balance_at(db, user.id, start + timedelta(hours=3)) == 700
+
+
+def test_snapshots_skip_entries_newer_than_the_lag(db, make_user):
+    user = make_user("ledgerlag", balance=0)
+    now = datetime(2026, 1, 1, 12)
+
+    post_transfer(db, user, 1000, LedgerEntryType.GRANT, "platform:grants")
+    db.commit()
+    backdate(db, user, now - timedelta(minutes=1))
+
+    # Still inside the lag window: no snapshot yet
+    take_balance_snapshots(db, now=now, lag=timedelta(minutes=5))
+    assert db.query(BalanceSnapshot).filter(BalanceSnapshot.user_id == user.id).count() == 0
+
+    take_balance_snapshots(db, now=now + timedelta(minutes=10), lag=timedelta(minutes=5))
+    snapshot = db.query(BalanceSnapshot).filter(BalanceSnapshot.user_id == user.id).one()
+    assert (snapshot.balance, snapshot.taken_at) == (1000, now + timedelta(minutes=5))
+
+    # Nothing new since: no second snapshot
+    take_balance_snapshots(db, now=now + timedelta(minutes=20), lag=timedelta(minutes=5))
+    assert db.query(BalanceSnapshot).filter(BalanceSnapshot.user_id == user.id).count() == 1
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+from app.models import User, PortfolioSnapshot
+from app.portfolio_history import take_portfolio_snapshots
+
+
+def test_one_hourly_snapshot_per_user_across_workers(db):
+    user = User(username="snapshotter", email="snapshotter@example.com", hashed_password="x", balance=500)
+    db.add(user)
+    db.commit()
+
+    now = datetime(2026, 1, 5, 10, 20)
+    users = db.query(User).count()
+    try:
+        # Each worker runs the job on its own schedule within the hour
+        assert take_portfolio_snapshots(db, now) == users
+        assert take_portfolio_snapshots(db, now + timedelta(minutes=25)) == 0
+        assert take_portfolio_snapshots(db, now + timedelta(hours=1)) == users
+
+        taken = db.query(PortfolioSnapshot.taken_at).filter(PortfolioSnapshot.user_id == user.id).all()
+        assert sorted(taken) == [(datetime(2026, 1, 5, 10),), (datetime(2026, 1, 5, 11),)]
+    finally:
+        db.query(PortfolioSnapshot).delete()
+        db.delete(user)
+        db.commit()
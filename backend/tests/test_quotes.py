@@ -0,0 +1,128 @@
+import orjson
+import pytest
+
+from app import quotes
+from app.models import Market, MarketCategory, MarketStatus
+from app.quotes import HEADER, QuoteBoard
+
+
+@pytest.fixture
+def market_id(db):
+    market = Market(college_name="Quote U", yes_price=40, no_price=60, category=MarketCategory.OTHER)
+    db.add(market)
+    db.commit()
+
+    yield market.id
+
+    db.delete(market)
+    db.commit()
+
+
+def quotes_of(payload) -> dict:
+    return orjson.loads(payload.body)
+
+
+def load_with_writes_during_query(db, monkeypatch, board: QuoteBoard, writes) -> None:
+    """
+    Load `board`, calling `writes` right after its markets query has read
+    the rows. `writes` must not touch the session.
+    """
+    execute = db.execute
+
+    def racing_execute(query):
+        rows = execute(query).all()
+        writes()
+        return rows
+
+    monkeypatch.setattr(db, "execute", racing_execute)
+    try:
+        board.load(db)
+    finally:
+        monkeypatch.undo()
+
+
+def test_version_ahead_of_the_board_gets_a_full_snapshot(db, market_id):
+    board = QuoteBoard()
+    board.load(db)
+    board.update(market_id, 45, 55, MarketStatus.OPEN)
+
+    delta = quotes_of(board.snapshot(since=board.version - 1))
+    assert delta["full"] is False
+    assert delta["quotes"] == [[market_id, 45, 55, "open"]]
+
+    # A client still holding a version from before a restart
+    restarted = QuoteBoard()
+    restarted.load(db)
+    snapshot = quotes_of(restarted.snapshot(since=board.version))
+    assert snapshot["full"] is True
+    assert snapshot["epoch"] == restarted.epoch != board.epoch
+
+
+def test_version_from_another_epoch_gets_a_full_snapshot(db, market_id):
+    board = QuoteBoard()
+    board.load(db)
+
+    assert quotes_of(board.snapshot(since=board.version, epoch=board.epoch))["full"] is False
+    assert quotes_of(board.snapshot(since=board.version, epoch=board.epoch + 1))["full"] is True
+
+    epoch, version, full, _ = HEADER.unpack_from(board.snapshot(binary=True).body)
+    assert (epoch, version, full) == (board.epoch, board.version, True)
+
+
+def test_load_keeps_updates_made_during_its_query(db, monkeypatch, market_id):
+    board = QuoteBoard()
+    board.load(db)
+    before = board.version
+    # A trade commits after the query read the row
+    load_with_writes_during_query(
+        db, monkeypatch, board, lambda: board.update(market_id, 47, 53, MarketStatus.OPEN)
+    )
+
+    quote = [market_id, 47, 53, "open"]
+    assert quote in quotes_of(board.snapshot())["quotes"]
+    assert quotes_of(board.snapshot(since=before))["quotes"] == [quote]
+
+
+def test_first_load_keeps_updates_made_during_its_query(db, monkeypatch, market_id):
+    board = QuoteBoard()
+    load_with_writes_during_query(
+        db, monkeypatch, board, lambda: board.update(market_id, 47, 53, MarketStatus.OPEN)
+    )
+
+    assert [market_id, 47, 53, "open"] in quotes_of(board.snapshot())["quotes"]
+
+
+def test_load_after_the_log_overflowed_keeps_the_board(db, monkeypatch, market_id):
+    board = QuoteBoard()
+    board.load(db)
+
+    def writes():
+        monkeypatch.setattr(quotes, "CHANGE_LOG_SIZE", 2)
+        for price in (41, 42, 43):
+            board.update(market_id, price, 100 - price, MarketStatus.OPEN)
+
+    load_with_writes_during_query(db, monkeypatch, board, writes)
+
+    assert [market_id, 43, 57, "open"] in quotes_of(board.snapshot())["quotes"]
+
+
+def test_reload_picks_up_writes_from_other_workers(db, market_id):
+    board = QuoteBoard()
+    board.load(db)
+    before = board.version
+
+    # Nothing changed: the version and cached snapshot stay put
+    snapshot = board.snapshot()
+    board.load(db)
+    assert board.version == before
+    assert board.snapshot() is snapshot
+
+    # Another worker fills a trade on this market
+    db.get(Market, market_id).yes_price = 44
+    db.commit()
+    board.load(db)
+
+    assert board.version == before + 1
+    assert quotes_of(board.snapshot(since=before, epoch=board.epoch))["quotes"] == [
+        [market_id, 44, 60, "open"]
+    ]
@@ -0,0 +1,123 @@
+"""
+Read routing, with SQLite files standing in for replicas: each replica is
+a copy of the primary taken at some point, so it lags behind it.
+"""
+import shutil
+from datetime import timedelta
+
+import pytest
+
+from app.database import DATABASE_URL, READ_YOUR_WRITES_SECONDS, ReadRouter, get_engine, read_router
+from app.models import User
+
+PRIMARY_PATH = DATABASE_URL.removeprefix("sqlite:///")
+DEAD_URL = "sqlite:////nonexistent/replica.db"
+
+
+@pytest.fixture
+def replica_url(tmp_path):
+    """Returns a function that snapshots the primary into a new replica file."""
+    count = 0
+
+    def snapshot() -> str:
+        nonlocal count
+        count += 1
+        path = tmp_path / f"replica{count}.db"
+        shutil.copy(PRIMARY_PATH, path)
+        return f"sqlite:///{path}"
+
+    return snapshot
+
+
+def route(router: ReadRouter) -> int | None:
+    db, replica = router.session()
+    db.close()
+    return replica
+
+
+def test_round_robin_across_replicas(replica_url):
+    router = ReadRouter([replica_url(), replica_url()])
+
+    assert [route(router) for _ in range(4)] == [0, 1, 0, 1]
+
+
+def test_dead_replica_is_skipped(replica_url):
+    router = ReadRouter([DEAD_URL, replica_url()])
+
+    assert [route(router) for _ in range(4)] == [1, 1, 1, 1]
+    assert list(router._down_until) == [0]
+
+
+def test_falls_back_to_primary(replica_url):
+    router = ReadRouter([DEAD_URL, DEAD_URL.replace("replica", "other")])
+
+    db, replica = router.session()
+    try:
+        assert replica is None
+        assert db.get_bind() is get_engine()
+    finally:
+        db.close()
+
+
+def test_query_failing_on_replica_is_retried_on_primary(db, tmp_path):
+    # The file opens fine but has no tables, so the first query fails
+    empty = tmp_path / "empty.db"
+    empty.touch()
+    router = ReadRouter([f"sqlite:///{empty}"])
+
+    replica_db, replica = router.session()
+    try:
+        assert replica == 0
+        assert replica_db.query(User).count() == db.query(User).count()
+        assert replica_db.replica is None
+        assert list(router._down_until) == [0]
+    finally:
+        replica_db.close()
+
+    assert route(router) is None
+
+
+@pytest.fixture
+def lagging_replica(replica_url, monkeypatch):
+    """Route reads to a replica that stops at the moment this is called."""
+    def freeze():
+        monkeypatch.setattr(read_router, "urls", [replica_url()])
+        monkeypatch.setattr(read_router, "_replicas", None)
+        monkeypatch.setattr(read_router, "_down_until", {})
+
+    return freeze
+
+
+def test_users_read_their_own_trade_right_after_it(db, client, signup, lagging_replica):
+    headers = signup("replicareader")
+    market = client.post(
+        "/markets", json={"college_name": "Replica U", "yes_price": 40, "no_price": 60}, headers=headers
+    ).json()
+
+    # The replica stops here, before the trade
+    lagging_replica()
+
+    response = client.post("/trade", json={"market_id": market["id"], "outcome": "YES", "shares": 10}, headers=headers)
+    assert response.status_code == 200
+
+    # Within the read-your-writes window the user is served by the primary,
+    # whichever worker handles the read: the write time is on the user row
+    assert len(client.get("/transactions", headers=headers).json()) == 1
+    assert len(client.get("/portfolio", headers=headers).json()["positions"]) == 1
+
+    # Once it lapses, reads go back to the (stale) replica
+    user = db.query(User).filter(User.username == "replicareader").one()
+    user.last_write_at -= timedelta(seconds=READ_YOUR_WRITES_SECONDS)
+    db.commit()
+    assert client.get("/transactions", headers=headers).json() == []
+
+
+def test_market_list_is_not_cached_from_a_lagging_replica(client, signup, lagging_replica):
+    headers = signup("replicalister")
+    lagging_replica()
+
+    market = client.post(
+        "/markets", json={"college_name": "Fresh U", "yes_price": 40, "no_price": 60}, headers=headers
+    ).json()
+
+    assert market["id"] in {listed["id"] for listed in client.get("/markets").json()}
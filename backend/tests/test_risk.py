@@ -0,0 +1,174 @@
+import pytest
+
+from app import auth, risk
+from app.models import (
+    User, Market, MarketOutcome, MarketStats, Position, MarketCategory, MarketType, OutcomeType
+)
+from app.risk import RiskBook, preview_resolution, risk_book
+
+
+@pytest.fixture
+def market(db):
+    user = User(username="riskholder", email="riskholder@example.com", hashed_password="x")
+    market = Market(
+        college_name="Risk U", yes_price=50, no_price=50, category=MarketCategory.OTHER,
+        stats=MarketStats(traded_notional=3000)
+    )
+    db.add_all([user, market])
+    db.flush()
+    db.add_all([
+        Position(user_id=user.id, market_id=market.id, outcome=OutcomeType.YES, shares=40, average_cost=50),
+        Position(user_id=user.id, market_id=market.id, outcome=OutcomeType.NO, shares=20, average_cost=50),
+    ])
+    db.commit()
+
+    yield market
+
+    db.query(Position).filter(Position.market_id == market.id).delete()
+    db.delete(market)
+    db.delete(user)
+    db.commit()
+
+
+def load_with_fill_during_query(db, monkeypatch, book: RiskBook, market: Market, version_offset: int):
+    """Load `book`, recording a 10-share YES fill while the positions query runs."""
+    query_books = risk._query_books
+
+    def racing_query(db):
+        books, multi, versions = query_books(db)
+        book.record_fill(market.id, versions[market.id] + version_offset, "YES", 10, 500, True)
+        return books, multi, versions
+
+    monkeypatch.setattr(risk, "_query_books", racing_query)
+    book.load(db)
+
+
+def test_fill_committed_after_the_query_is_replayed(db, monkeypatch, market):
+    book = RiskBook()
+    load_with_fill_during_query(db, monkeypatch, book, market, version_offset=1)
+
+    exposure = book.exposure(market.id)
+    assert exposure["yes_liability"] == 50 * 100
+    assert exposure["premiums_collected"] == 3500
+
+
+def test_fill_the_query_already_saw_is_not_counted_twice(db, monkeypatch, market):
+    book = RiskBook()
+    load_with_fill_during_query(db, monkeypatch, book, market, version_offset=0)
+
+    exposure = book.exposure(market.id)
+    assert exposure["yes_liability"] == 40 * 100
+    assert exposure["premiums_collected"] == 3000
+
+
+def test_fills_after_load_apply_directly(db, market):
+    book = RiskBook()
+    book.load(db)
+    book.record_fill(market.id, market.version_id + 1, "NO", 5, 250, False)
+
+    assert book.preview(market.id, "NO") == {
+        "market_id": market.id,
+        "outcome": "NO",
+        "payout": 25 * 100,
+        "winning_positions": 1,
+        "premiums_collected": 3250,
+        "net_exposure": 2500 - 3250,
+    }
+
+
+def test_preview_resolution_matches_the_loaded_book(db, market):
+    book = RiskBook()
+    book.load(db)
+
+    previews = preview_resolution(db, market)
+    assert previews == {outcome: book.preview(market.id, outcome) for outcome in ("YES", "NO")}
+    assert previews["YES"]["payout"] == 4000
+
+
+def test_market_risk_is_404_for_unknown_market(db, client, signup, monkeypatch, market):
+    headers = signup("riskadmin")
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", {"riskadmin"})
+    # The market was seeded straight into the database, not through /trade
+    risk_book.load(db)
+
+    assert client.get("/admin/risk/999999", headers=headers).status_code == 404
+
+    response = client.get(f"/admin/risk/{market.id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["if_yes"]["payout"] == 4000
+
+
+@pytest.fixture
+def multi_market(db):
+    user = User(username="multiholder", email="multiholder@example.com", hashed_password="x")
+    market = Market(
+        college_name="Multi U", yes_price=50, no_price=50, category=MarketCategory.OTHER,
+        market_type=MarketType.MULTI, stats=MarketStats(traded_notional=2000),
+        outcomes=[
+            MarketOutcome(index=0, label="CS", price=50),
+            MarketOutcome(index=1, label="Econ", price=30),
+            MarketOutcome(index=2, label="Art", price=20),
+        ]
+    )
+    db.add_all([user, market])
+    db.flush()
+    cs, econ, _ = market.outcomes
+    db.add_all([
+        Position(user_id=user.id, market_id=market.id, outcome=OutcomeType.YES, outcome_id=cs.id, shares=30, average_cost=50),
+        Position(user_id=user.id, market_id=market.id, outcome=OutcomeType.YES, outcome_id=econ.id, shares=10, average_cost=30),
+    ])
+    db.commit()
+
+    yield market
+
+    db.query(Position).filter(Position.market_id == market.id).delete()
+    db.delete(market)
+    db.delete(user)
+    db.commit()
+
+
+def test_multi_outcome_markets_carry_one_liability_per_outcome(db, multi_market):
+    book = RiskBook()
+    book.load(db)
+    book.record_fill(multi_market.id, multi_market.version_id + 1, "Econ", 25, 750, False, multi=True)
+
+    exposure = book.exposure(multi_market.id)
+    assert exposure["outcome_liabilities"] == {"CS": 3000, "Econ": 3500}
+    assert exposure["worst_outcome"] == "Econ"
+    assert exposure["worst_case_exposure"] == 3500 - 2750
+
+    summary = book.summary()
+    assert summary["multi_liability"] == 3500
+    assert multi_market.id in {market["market_id"] for market in summary["top_markets"]}
+
+    book.drop(multi_market.id)
+    assert book.exposure(multi_market.id)["worst_case_exposure"] == 0
+
+
+def test_multi_outcome_preview_resolution(db, multi_market):
+    book = RiskBook()
+    book.load(db)
+
+    previews = preview_resolution(db, multi_market)
+    assert list(previews) == ["CS", "Econ", "Art"]
+    assert previews == {label: book.preview(multi_market.id, label) for label in previews}
+    assert previews["CS"]["payout"] == 3000
+    assert previews["Art"]["winning_positions"] == 0
+
+
+def test_multi_outcome_trades_reach_the_risk_book(db, client, signup, monkeypatch):
+    headers = signup("multirisk")
+    monkeypatch.setattr(auth, "ADMIN_USERNAMES", {"multirisk"})
+    market = client.post(
+        "/markets/multi", json={"college_name": "Multi Risk U", "outcomes": ["CS", "Econ"]}, headers=headers
+    ).json()
+    risk_book.load(db)
+
+    response = client.post("/trade/multi", json={"market_id": market["id"], "outcome_index": 1, "shares": 10}, headers=headers)
+    assert response.status_code == 200
+
+    risk = client.get(f"/admin/risk/{market['id']}", headers=headers).json()
+    assert risk["outcome_liabilities"] == {"Econ": 1000}
+    assert risk["premiums_collected"] == response.json()["total_cost"]
+    assert risk["if_outcome"]["Econ"]["winning_positions"] == 1
+    assert risk["if_outcome"]["CS"]["payout"] == 0
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import MarketCreate, MultiMarketCreate
+
+
+def binary(**deadlines):
+    return MarketCreate(college_name="Stanford", yes_price=40, no_price=60, **deadlines)
+
+
+def multi(**deadlines):
+    return MultiMarketCreate(college_name="Stanford", outcomes=["CS", "Econ"], **deadlines)
+
+
+@pytest.mark.parametrize("create", [binary, multi])
+def test_deadlines_are_stored_as_naive_utc(create):
+    close_at = datetime.now(timezone(timedelta(hours=-8))) + timedelta(days=1)
+    market = create(close_at=close_at, resolve_at=close_at + timedelta(days=1))
+
+    assert market.close_at.tzinfo is None
+    assert market.close_at == close_at.astimezone(timezone.utc).replace(tzinfo=None)
+    assert market.resolve_at - market.close_at == timedelta(days=1)
+
+
+@pytest.mark.parametrize("create", [binary, multi])
+@pytest.mark.parametrize("field", ["close_at", "resolve_at"])
+def test_past_deadlines_are_rejected(create, field):
+    with pytest.raises(ValidationError, match="Deadline must be in the future"):
+        create(**{field: datetime.utcnow() - timedelta(minutes=1)})
+
+
+@pytest.mark.parametrize("create", [binary, multi])
+def test_resolve_at_before_close_at_is_rejected(create):
+    close_at = datetime.utcnow() + timedelta(days=2)
+    with pytest.raises(ValidationError, match="resolve_at must not be before close_at"):
+        create(close_at=close_at, resolve_at=close_at - timedelta(days=1))
+
+    market = create(close_at=close_at, resolve_at=close_at)
+    assert market.resolve_at == market.close_at
@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from app import search
+from app.models import Market, MarketCategory, MarketStatus
+from app.search import DESCRIPTION_WEIGHT, EXACT_BONUS, NAME_WEIGHT, MarketSearchIndex, tokenize
+
+STATUSES = [status.value for status in MarketStatus]
+CATEGORIES = [category.value for category in MarketCategory]
+
+
+def market(market_id: int, name: str, description: str | None = None, status: str = "open", category: str = "other"):
+    return Market(
+        id=market_id, college_name=name, description=description,
+        status=MarketStatus(status), category=MarketCategory(category)
+    )
+
+
+def brute_force(markets: list[Market], q: str, status=None, category=None, limit=20) -> list[int]:
+    """Rank every market by the index's scoring rules, prefix matches only."""
+    ranked = []
+    for m in markets:
+        if status and m.status.value != status or category and m.category.value != category:
+            continue
+        words = dict.fromkeys(tokenize(m.description), DESCRIPTION_WEIGHT)
+        words.update(dict.fromkeys(tokenize(m.college_name), NAME_WEIGHT))
+
+        total = 0.0
+        for term in tokenize(q):
+            weights = [weight for word, weight in words.items() if word.startswith(term)]
+            if not weights:
+                break
+            score = max(weights)
+            if term in words:
+                score = max(score, words[term] + EXACT_BONUS)
+            total += score
+        else:
+            ranked.append((-total, m.id))
+
+    return [market_id for _, market_id in sorted(ranked)[:limit]]
+
+
+def build(markets: list[Market]) -> MarketSearchIndex:
+    index = MarketSearchIndex()
+    for m in markets:
+        index.add(m)
+    return index
+
+
+def test_filter_reaches_past_the_top_list():
+    # The oldest markets fill every top list and are all resolved
+    markets = [
+        market(i, f"UC Campus{i}", status="resolved" if i <= 120 else "open", category="uc")
+        for i in range(1, 151)
+    ]
+    index = build(markets)
+
+    for q in ("uc", "ca", "u c", "uc campus"):
+        assert index.search(q, status="open") == brute_force(markets, q, status="open"), q
+        assert len(index.search(q, status="open", limit=50)) == 30
+
+
+def test_page_beyond_the_top_list():
+    markets = [market(i, f"Stanford {i}") for i in range(1, 200)]
+    index = build(markets)
+
+    assert index.search("s", limit=100) == brute_force(markets, "s", limit=100)
+
+
+def test_exact_word_outranks_longer_words():
+    index = build([market(1, "Calpoly"), market(2, "Cal State"), market(3, "Riverside", "near cal")])
+
+    assert index.search("cal") == [2, 1, 3]
+
+
+def test_typos_fall_back_to_trigrams():
+    index = build([market(1, "UC Berkeley"), market(2, "UC Berkeley Law"), market(3, "Stanford")])
+
+    assert index.search("berkely") == [1, 2]
+    assert index.search("berkely law") == [2]
+    assert index.search("zzzzzz") == []
+
+
+def test_updates_move_markets_in_and_out():
+    index = build([market(i, "Harvard", category="ivy") for i in range(1, 6)])
+
+    index.remove(1)
+    index.update_status(2, "resolved")
+    index.add(market(3, "Yale", category="ivy"))
+
+    assert index.search("harvard") == [2, 4, 5]
+    assert index.search("harvard", status="open") == [4, 5]
+    assert index.search("yale", category="ivy") == [3]
+    assert index.search("yale", category="uc") == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force(monkeypatch, seed):
+    # Small top lists and a tiny vocabulary, so most prefixes overflow them
+    monkeypatch.setattr(search, "NODE_TOP_K", 8)
+    rng = random.Random(seed)
+    vocabulary = ["uc", "ucla", "usc", "cal", "calpoly", "campus", "state", "stan", "stanford", "tech", "texas"]
+
+    def text(words: int) -> str:
+        return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+    markets = [
+        market(i, text(rng.randint(1, 3)), text(rng.randint(0, 3)) or None,
+               rng.choice(STATUSES), rng.choice(CATEGORIES))
+        for i in range(1, 301)
+    ]
+    index = build(markets)
+    for m in rng.sample(markets, 60):
+        index.remove(m.id)
+        if rng.random() < 0.5:
+            m.status = MarketStatus(rng.choice(STATUSES))
+            index.add(m)
+        else:
+            markets.remove(m)
+
+    prefixes = [word[:end] for word in vocabulary for end in range(1, len(word) + 1)]
+    for _ in range(300):
+        q = " ".join(rng.sample(prefixes, rng.randint(1, 3)))
+        status = rng.choice([None, *STATUSES])
+        category = rng.choice([None, *CATEGORIES])
+        limit = rng.choice([1, 5, 20])
+        assert index.search(q, status, category, limit) == brute_force(markets, q, status, category, limit), (
+            q, status, category, limit
+        )
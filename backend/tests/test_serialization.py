@@ -0,0 +1,151 @@
+"""
+The orjson fast paths must produce exactly the bytes FastAPI used to build
+from the response models.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.main import build_position_response
+from app.models import (
+    User, Market, MarketStats, Position, Transaction,
+    MarketStatus, MarketCategory, OutcomeType, TransactionType, current_bucket
+)
+from app.schemas import MarketResponse, PortfolioSummary, TransactionResponse
+from app.serialization import dump_markets, dump_portfolio, dump_transactions
+
+
+def encoded(content) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+@pytest.fixture
+def user(db):
+    now = datetime.utcnow()
+    hour = current_bucket(now)
+
+    user = User(username="zoë_ñ", email="zoe@example.com", hashed_password="x", balance=123456)
+    markets = [
+        Market(
+            college_name="Université de Montréal", description=None, yes_price=37, no_price=63,
+            category=MarketCategory.INTERNATIONAL, close_at=now + timedelta(days=3)
+        ),
+        Market(
+            college_name="東京大学", description="Admit “early” — ½ chance?", yes_price=1, no_price=99,
+            category=MarketCategory.INTERNATIONAL,
+            stats=MarketStats(
+                trade_count=3, traded_notional=4200, unique_traders=2, open_interest=70,
+                volume_buckets=[[hour - 30, 5, 10, 12], [hour - 1, 50, 20, 25], [hour, 20, 25, 1]]
+            )
+        ),
+        Market(
+            college_name="UC Berkeley", description=None, yes_price=100, no_price=0,
+            category=MarketCategory.UC, status=MarketStatus.RESOLVED, resolved_outcome="YES",
+            resolution_date=now.replace(microsecond=0), total_yes_shares=40, total_no_shares=30,
+            stats=MarketStats(trade_count=0, traded_notional=0, unique_traders=0, open_interest=0, volume_buckets=[])
+        ),
+    ]
+    db.add(user)
+    db.add_all(markets)
+    db.flush()
+
+    first, second, resolved = markets
+    db.add_all([
+        Position(user_id=user.id, market_id=first.id, outcome=OutcomeType.YES, shares=10, average_cost=0),
+        Position(user_id=user.id, market_id=first.id, outcome=OutcomeType.NO, shares=0, average_cost=55),
+        Position(user_id=user.id, market_id=second.id, outcome=OutcomeType.NO, shares=70, average_cost=98),
+        Position(user_id=user.id, market_id=resolved.id, outcome=OutcomeType.YES, shares=40, average_cost=33),
+    ])
+    db.add_all([
+        Transaction(
+            user_id=user.id, market_id=market.id, transaction_type=TransactionType.BUY, outcome=outcome,
+            shares=shares, price_per_share=price, total_cost=shares * price, timestamp=timestamp
+        )
+        for market, outcome, shares, price, timestamp in [
+            (first, OutcomeType.YES, 10, 0, now - timedelta(hours=2)),
+            (second, OutcomeType.NO, 70, 98, now.replace(microsecond=0) - timedelta(hours=1)),
+            (resolved, OutcomeType.YES, 40, 33, now - timedelta(minutes=5)),
+            (resolved, OutcomeType.YES, 1, 33, now - timedelta(minutes=5)),
+        ]
+    ])
+    db.commit()
+
+    yield user
+
+    db.query(Transaction).filter(Transaction.user_id == user.id).delete()
+    db.query(Position).filter(Position.user_id == user.id).delete()
+    for market in markets:
+        db.delete(market)
+    db.delete(user)
+    db.commit()
+
+
+def test_markets_match_market_response(db, user):
+    markets = db.query(Market).order_by(Market.id).all()
+    assert dump_markets(db) == encoded([MarketResponse.model_validate(market) for market in markets])
+
+    international = [market for market in markets if market.category == MarketCategory.INTERNATIONAL]
+    assert dump_markets(db, MarketCategory.INTERNATIONAL) == encoded(
+        [MarketResponse.model_validate(market) for market in international]
+    )
+
+
+def test_portfolio_matches_portfolio_summary(db, user):
+    positions = (
+        db.query(Position)
+        .filter(Position.user_id == user.id, Position.shares > 0)
+        .order_by(Position.id)
+        .all()
+    )
+    responses = [build_position_response(position, position.market) for position in positions]
+    total_invested = sum(response.cost_basis for response in responses)
+    total_current_value = sum(response.current_value for response in responses)
+    total_pnl = total_current_value - total_invested
+
+    assert dump_portfolio(db, user) == encoded(PortfolioSummary(
+        balance=user.balance,
+        total_invested=total_invested,
+        total_current_value=total_current_value,
+        total_unrealized_pnl=total_pnl,
+        total_unrealized_pnl_percent=(total_pnl / total_invested * 100) if total_invested > 0 else 0,
+        positions=responses
+    ))
+
+
+def test_portfolio_with_only_zero_cost_positions(db, user):
+    db.query(Position).filter(Position.user_id == user.id, Position.average_cost > 0).delete()
+    db.commit()
+
+    payload = dump_portfolio(db, user)
+    assert b'"unrealized_pnl_percent":0.0' in payload
+    assert b'"total_unrealized_pnl_percent":0.0' in payload
+
+
+def test_transactions_match_transaction_response(db, user):
+    transactions = (
+        db.query(Transaction)
+        .filter(Transaction.user_id == user.id)
+        .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+        .all()
+    )
+    responses = [
+        TransactionResponse(
+            id=transaction.id,
+            market_id=transaction.market_id,
+            transaction_type=transaction.transaction_type.value,
+            outcome=transaction.outcome.value,
+            shares=transaction.shares,
+            price_per_share=transaction.price_per_share,
+            total_cost=transaction.total_cost,
+            timestamp=transaction.timestamp,
+            market_college_name=transaction.market.college_name
+        )
+        for transaction in transactions
+    ]
+
+    assert dump_transactions(db, user) == encoded(responses)
+    assert dump_transactions(db, user, limit=2) == encoded(responses[:2])
+    last = responses[1]
+    assert dump_transactions(db, user, limit=2, cursor=(last.timestamp, last.id)) == encoded(responses[2:4])
@@ -0,0 +1,53 @@
+from app.models import User
+from app.simulation import ReplayEngine, export_transactions, read_fills, synthetic_fills
+
+
+def test_resolution_pays_winners_and_closes_positions():
+    engine = ReplayEngine(starting_balance=10000)
+    engine.open_market(7, 40)
+    # Each fill moves the price a cent: YES at 40 then 41, NO at 58
+    engine.run([
+        (1, 7, "YES", 10, None),
+        (1, 7, "YES", 10, None),
+        (2, 7, "NO", 20, None),
+    ])
+    assert engine.positions[7][(1, "YES")] == [20, 40]
+
+    engine.resolve_market(7, "YES")
+
+    assert 7 not in engine.positions
+    assert engine.balances[1] == 10000 - 10 * 40 - 10 * 41 + 20 * 100
+    assert engine.balances[2] == 10000 - 20 * 58
+    assert engine.resolved == 1
+
+
+def test_synthetic_traders_keep_trading():
+    engine = ReplayEngine()
+    result = engine.run(synthetic_fills(engine, 50000, markets=20, users=100))
+
+    assert result.resolved == 50000 // 20
+    assert result.accepted > 0.9 * result.fills
+
+
+def test_exported_history_replays_to_the_database_balances(db, client, signup, tmp_path):
+    alice, bob = signup("replayalice"), signup("replaybob")
+    market = client.post(
+        "/markets", json={"college_name": "Replay U", "yes_price": 40, "no_price": 60}, headers=alice
+    ).json()
+    for headers, outcome, shares in ((alice, "YES", 10), (bob, "NO", 20), (alice, "YES", 5)):
+        response = client.post(
+            "/trade", json={"market_id": market["id"], "outcome": outcome, "shares": shares}, headers=headers
+        )
+        assert response.status_code == 200
+    assert client.post(f"/markets/{market['id']}/resolve", json={"outcome": "YES"}, headers=alice).status_code == 200
+
+    path = str(tmp_path / "log.csv")
+    export_transactions(db, path)
+    engine = ReplayEngine()
+    result = engine.run(read_fills(path))
+
+    assert result.price_mismatches == 0
+    assert market["id"] not in engine.positions
+    users = db.query(User).filter(User.username.in_(["replayalice", "replaybob"])).all()
+    for user in users:
+        assert result.balances[user.id] == user.balance